@@ -1,21 +1,58 @@
 """
 Final production build script for SuperDiagnosticTool
-Run: python build.py
+Run: python build.py          (skips PyInstaller when inputs are unchanged)
+     python build.py --force  (always rebuild)
 """
 
 import subprocess
 import sys
 import os
 import shutil
+import json
+import hashlib
+from importlib import metadata
+
+BUILD_CACHE = ".build-cache.json"
+EXE_PATH = os.path.join("dist", "SuperDiagnosticTool.exe")
+BUILD_INPUTS = ["super_diagnose_v2.py", "icon.ico", "requirements.txt"]
 
 def run_command(cmd):
-    """Run a command and return success status."""
+    """Run a command (argument list, no shell) and return success status."""
     try:
-        result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
+        result = subprocess.run(cmd, check=True, capture_output=True, text=True)
         return True, result.stdout
     except subprocess.CalledProcessError as e:
         return False, e.stderr
 
+def build_key():
+    """Hash every build input plus the PyInstaller version."""
+    digest = hashlib.blake2b(digest_size=16)
+    
+    sources = list(BUILD_INPUTS)
+    for root, _, files in os.walk("src"):
+        sources.extend(os.path.join(root, name) for name in files if name.endswith(".py"))
+    
+    for path in sorted(sources):
+        digest.update(path.replace(os.sep, "/").encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    
+    try:
+        digest.update(metadata.version("pyinstaller").encode())
+    except metadata.PackageNotFoundError:
+        pass
+    return digest.hexdigest()
+
+def is_up_to_date(key):
+    """True when the last successful build used the same inputs."""
+    if not os.path.exists(EXE_PATH) or not os.path.exists(BUILD_CACHE):
+        return False
+    try:
+        with open(BUILD_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f).get("key") == key
+    except (OSError, ValueError):
+        return False
+
 def main():
     print("=" * 60)
     print("SuperDiagnosticTool - Production Build")
@@ -24,28 +61,35 @@ def main():
     
     # Check dependencies
     print("[1/4] Checking dependencies...")
-    success, _ = run_command("pip show pyinstaller")
+    success, _ = run_command([sys.executable, "-m", "pip", "show", "pyinstaller"])
     if not success:
         print("Installing PyInstaller...")
-        run_command("pip install pyinstaller")
+        run_command([sys.executable, "-m", "pip", "install", "pyinstaller"])
+    
+    key = build_key()
+    if "--force" not in sys.argv and is_up_to_date(key):
+        print("[2/4] Up to date - sources unchanged since last build.")
+        print(f"      {EXE_PATH}")
+        return True
     
     # Build
     print("[2/4] Building executable...")
     cmd = [
-        f'"{sys.executable}"', "-m", "PyInstaller",
+        sys.executable, "-m", "PyInstaller",
         "--onefile",
         "--noconfirm",
         "--name", "SuperDiagnosticTool",
         "--icon", "icon.ico",
         "--hidden-import=google.generativeai",
         "--hidden-import=psutil",
+        "--collect-submodules", "src",  # src.safety imports its modules lazily
         "--collect-all", "rich",
         "--console",
         "--clean",
         "super_diagnose_v2.py"
     ]
     
-    success, output = run_command(" ".join(cmd))
+    success, output = run_command(cmd)
     if not success:
         print(f"ERROR: {output}")
         return False
@@ -57,6 +101,9 @@ def main():
     if os.path.exists("SuperDiagnosticTool.spec"):
         os.remove("SuperDiagnosticTool.spec")
     
+    with open(BUILD_CACHE, "w", encoding="utf-8") as f:
+        json.dump({"key": key}, f)
+    
     print("[4/4] Done!")
     print()
     print("=" * 60)
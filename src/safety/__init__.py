@@ -1,11 +1,17 @@
 """Safety module for SuperDiagnosticTool - Production-grade security features."""
 
-from .restore_point import RestorePointManager
-from .validator import ScriptValidator
-from .sandbox import SandboxExecutor
-from .dry_run import DryRunSimulator
-from .enhanced_monitoring import EnhancedMonitoring
-from .knowledge_base import KnowledgeBase
+import importlib
+
+# Submodules are imported on first attribute access (PEP 562), so importing
+# one class does not pull in every other safety component
+_LAZY_IMPORTS = {
+    'RestorePointManager': 'restore_point',
+    'ScriptValidator': 'validator',
+    'SandboxExecutor': 'sandbox',
+    'DryRunSimulator': 'dry_run',
+    'EnhancedMonitoring': 'enhanced_monitoring',
+    'KnowledgeBase': 'knowledge_base'
+}
 
 __all__ = [
     'RestorePointManager',
@@ -15,3 +21,17 @@ __all__ = [
     'EnhancedMonitoring',
     'KnowledgeBase'
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,32 @@
+"""Regex helpers shared by the scanners that fuse many patterns into one pass."""
+
+import re
+from typing import List
+
+
+def fuse_patterns(patterns) -> str:
+    """
+    Fuse patterns into one alternation of zero-width lookahead branches.
+    
+    Lookaheads let overlapping hits from different patterns (e.g.
+    "Restart-Service" also containing "Start-Service") survive, exactly as
+    with one findall() per pattern. Branches are grouped by their leading
+    letter behind a first-character guard so most positions are rejected
+    without trying every branch (all patterns start with a literal character).
+    """
+    by_letter = {}
+    for i, pattern in enumerate(patterns):
+        by_letter.setdefault(pattern[0].lower(), []).append(f'(?=(?P<p{i}>{pattern}))')
+    
+    branches = '|'.join(
+        f'(?={re.escape(letter)})(?:{"|".join(group)})' for letter, group in by_letter.items()
+    )
+    return f'(?=[{"".join(map(re.escape, by_letter))}])(?:{branches})'
+
+
+def same_start(patterns) -> List[List[int]]:
+    """For each pattern, the later patterns sharing its first three characters."""
+    return [
+        [j for j in range(i + 1, len(patterns)) if patterns[j][:3].lower() == patterns[i][:3].lower()]
+        for i in range(len(patterns))
+    ]
@@ -1,19 +1,173 @@
 """Dry-run simulator for PowerShell scripts - preview changes without execution."""
 
 import re
-from typing import Dict, List, Set
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Set, Tuple, Union
+
+from ._regex import fuse_patterns, same_start
+
+
+# (result key, action, pattern) in reporting order. Every pattern is fused
+# into the single scanner below, so the script is walked exactly once.
+# Wildcards are bounded to one line and 200 characters so adversarial
+# scripts cannot trigger catastrophic backtracking.
+_SCAN_TABLE = [
+    ('services_affected', 'STOP', r'Stop-Service\s+["\']?([^"\'\s]+)'),
+    ('services_affected', 'START', r'Start-Service\s+["\']?([^"\'\s]+)'),
+    ('services_affected', 'RESTART', r'Restart-Service\s+["\']?([^"\'\s]+)'),
+    ('services_affected', 'CONFIGURE', r'Set-Service\s+["\']?([^"\'\s]+)[^\n]{0,200}?-StartupType\s+(\w+)'),
+    ('services_affected', 'DISABLE', r'Disable-Service\s+["\']?([^"\'\s]+)'),
+
+    ('files_affected', 'DELETE', r'Remove-Item\s+["\']?([^"\'\r\n]+)'),
+    ('files_affected', 'DELETE', r'Delete\s+["\']?([^"\'\r\n]+)'),
+    ('files_affected', 'CREATE', r'New-Item\s+["\']?([^"\'\r\n]+)'),
+    ('files_affected', 'MODIFY', r'Set-Content\s+["\']?([^"\'\r\n]+)'),
+    ('files_affected', 'CLEAR', r'Clear-Content\s+["\']?([^"\'\r\n]+)'),
+
+    ('registry_affected', 'MODIFY', r'Set-ItemProperty\b[^\n]{0,200}?Registry[^\n]{0,200}?["\']?([^"\'\s:][^"\'\s]*)'),
+    ('registry_affected', 'CREATE', r'New-ItemProperty\b[^\n]{0,200}?Registry[^\n]{0,200}?["\']?([^"\'\s:][^"\'\s]*)'),
+    ('registry_affected', 'DELETE', r'Remove-ItemProperty\b[^\n]{0,200}?Registry[^\n]{0,200}?["\']?([^"\'\s:][^"\'\s]*)'),
+    ('registry_affected', 'ADD', r'reg\s+add\s+([^\s]+)'),
+    ('registry_affected', 'DELETE', r'reg\s+delete\s+([^\s]+)'),
+
+    ('processes_affected', 'STOP', r'Stop-Process\s+[^\n]{0,200}?-Name\s+["\']?([^"\'\s]+)'),
+    ('processes_affected', 'STOP', r'Stop-Process\s+[^\n]{0,200}?-Id\s+(\d+)'),
+    ('processes_affected', 'START', r'Start-Process\s+["\']?([^"\'\r\n]+)'),
+
+    ('network_changes', None, r'netsh[^\n]{0,200}?firewall'),
+    ('network_changes', None, r'netsh[^\n]{0,200}?advfirewall'),
+    ('network_changes', None, r'Set-NetFirewallRule'),
+    ('network_changes', None, r'New-NetFirewallRule'),
+    ('network_changes', None, r'Clear-DnsClientCache'),
+    ('network_changes', None, r'ipconfig\s+/flushdns'),
+]
+
+# Dict field (for as_dicts) and summary label per category; network changes
+# are plain strings
+_CATEGORY_FIELDS = {
+    'services_affected': ('name', 'service'),
+    'files_affected': ('path', 'file'),
+    'registry_affected': ('key', 'registry'),
+    'processes_affected': ('name', 'process'),
+}
+
+
+# Risk weight per counted item; the last two are extra penalties on top
+_RISK_WEIGHTS = {
+    'services_affected': 2,
+    'files_affected': 3,
+    'registry_affected': 4,
+    'processes_affected': 1,
+    'network_changes': 3,
+    'file_deletes': 5,
+    'hklm_keys': 5,
+}
+
+
+_MASTER_RE = re.compile(fuse_patterns([pattern for _, _, pattern in _SCAN_TABLE]), re.IGNORECASE)
+_PATTERN_RES = [re.compile(pattern, re.IGNORECASE) for _, _, pattern in _SCAN_TABLE]
+
+# Same scanner over raw bytes, so UTF-8 scripts read from disk need no decode
+_MASTER_RE_BYTES = re.compile(_MASTER_RE.pattern.encode('ascii'), re.IGNORECASE)
+_PATTERN_RES_BYTES = [re.compile(rx.pattern.encode('ascii'), re.IGNORECASE) for rx in _PATTERN_RES]
+
+# Bytes-mode \s, \w, \b, case folding and {m,n} bounds only agree with the str
+# patterns on ASCII without the separators \x1c-\x1f (Unicode whitespace);
+# other scripts are decoded and scanned as text
+_NEEDS_TEXT_SCAN = re.compile(rb'[\x1c-\x1f\x80-\xff]')
+
+# group name -> (table index, group number of the whole hit, capture count)
+_DISPATCH = {
+    f'p{i}': (i, _MASTER_RE.groupindex[f'p{i}'], rx.groups)
+    for i, rx in enumerate(_PATTERN_RES)
+}
+
+# An alternation reports only the first branch matching at a position; later
+# patterns sharing the same leading keyword are re-checked at that position.
+_SAME_START = same_start([pattern for _, _, pattern in _SCAN_TABLE])
+
+
+def _match_value(match, first: int, groups: int):
+    """Return what re.findall() would have yielded for this hit."""
+    if groups == 0:
+        return match.group(first)
+    if groups == 1:
+        return match.group(first + 1)
+    return match.group(*range(first + 1, first + groups + 1))
+
+
+def _decode_value(value):
+    """Decode a bytes hit (or tuple of hits) captured from a UTF-8 script."""
+    if isinstance(value, tuple):
+        return tuple(part.decode('utf-8', 'replace') for part in value)
+    return value.decode('utf-8', 'replace')
 
 
 class DryRunSimulator:
     """Simulate PowerShell script execution to preview changes."""
     
+    # blake2b(script) -> analysis; repeated previews of one script skip the scan
+    _cache: "OrderedDict[Tuple[bytes, bool], Dict]" = OrderedDict()
+    _CACHE_SIZE = 64
+    
     @staticmethod
-    def simulate(script: str) -> Dict:
+    def simulate(script: Union[str, bytes], as_dicts: bool = False) -> Dict:
         """
         Simulate what the script would do without executing.
         
+        Affected services, files, registry keys and processes are reported as
+        (action, target) tuples, which are much lighter than one dict per hit.
+        Results are memoized by script hash; every call returns a fresh copy.
+        
         Args:
-            script: PowerShell script content
+            script: PowerShell script content, as text or UTF-8 bytes
+            as_dicts: Return the affected items as {'name'/'path'/'key', 'action'}
+                dicts instead of tuples (format_summary expects tuples)
+            
+        Returns:
+            Dictionary with impact analysis
+        """
+        is_text = isinstance(script, str)
+        data = script.encode('utf-8', 'surrogatepass') if is_text else script
+        key = (hashlib.blake2b(data, digest_size=16).digest(), is_text)
+        
+        cache = DryRunSimulator._cache
+        analysis = cache.get(key)
+        if analysis is None:
+            analysis = DryRunSimulator._analyze(script)
+            cache[key] = analysis
+            if len(cache) > DryRunSimulator._CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        
+        # Items are immutable tuples/strings, so copying the containers is enough
+        result = {
+            name: (list(value) if isinstance(value, list) else
+                   dict(value) if isinstance(value, dict) else value)
+            for name, value in analysis.items()
+        }
+        
+        if as_dicts:
+            for category, (field, _) in _CATEGORY_FIELDS.items():
+                result[category] = [{field: value, 'action': action}
+                                    for action, value in result[category]]
+        
+        return result
+    
+    @staticmethod
+    def cache_clear():
+        """Forget all memoized simulation results."""
+        DryRunSimulator._cache.clear()
+    
+    @staticmethod
+    def _analyze(script: Union[str, bytes]) -> Dict:
+        """
+        Scan the script and build the impact analysis (uncached).
+        
+        Args:
+            script: PowerShell script content, as text or UTF-8 bytes
             
         Returns:
             Dictionary with impact analysis
@@ -29,136 +183,89 @@ class DryRunSimulator:
             'change_summary': []
         }
         
-        # Analyze services
-        service_patterns = {
-            r'Stop-Service\s+["\']?([^"\'\s]+)': 'STOP',
-            r'Start-Service\s+["\']?([^"\'\s]+)': 'START',
-            r'Restart-Service\s+["\']?([^"\'\s]+)': 'RESTART',
-            r'Set-Service\s+["\']?([^"\'\s]+).*-StartupType\s+(\w+)': 'CONFIGURE',
-            r'Disable-Service\s+["\']?([^"\'\s]+)': 'DISABLE',
-        }
-        
-        for pattern, action in service_patterns.items():
-            matches = re.findall(pattern, script, re.IGNORECASE)
-            for match in matches:
-                service_name = match if isinstance(match, str) else match[0]
-                result['services_affected'].append({
-                    'name': service_name,
-                    'action': action
-                })
-                result['change_summary'].append(f"{action} service: {service_name}")
-        
-        # Analyze file operations
-        file_patterns = {
-            r'Remove-Item\s+["\']?([^"\']+)': 'DELETE',
-            r'Delete\s+["\']?([^"\']+)': 'DELETE',
-            r'New-Item\s+["\']?([^"\']+)': 'CREATE',
-            r'Set-Content\s+["\']?([^"\']+)': 'MODIFY',
-            r'Clear-Content\s+["\']?([^"\']+)': 'CLEAR',
-        }
+        # Single pass over the script; hits are bucketed per pattern so the
+        # result keeps the per-pattern ordering of the reports
+        is_bytes = isinstance(script, (bytes, bytearray, memoryview))
+        if is_bytes and _NEEDS_TEXT_SCAN.search(script):
+            script = bytes(script).decode('utf-8', 'replace')
+            is_bytes = False
+        master, singles = (
+            (_MASTER_RE_BYTES, _PATTERN_RES_BYTES) if is_bytes else (_MASTER_RE, _PATTERN_RES)
+        )
+        hits = [[] for _ in _SCAN_TABLE]
+        ends = [0] * len(_SCAN_TABLE)
         
-        for pattern, action in file_patterns.items():
-            matches = re.findall(pattern, script, re.IGNORECASE)
-            for match in matches:
-                result['files_affected'].append({
-                    'path': match,
-                    'action': action
-                })
-                result['change_summary'].append(f"{action} file: {match}")
-        
-        # Analyze registry operations
-        registry_patterns = {
-            r'Set-ItemProperty.*Registry.*["\']?([^"\']+)': 'MODIFY',
-            r'New-ItemProperty.*Registry.*["\']?([^"\']+)': 'CREATE',
-            r'Remove-ItemProperty.*Registry.*["\']?([^"\']+)': 'DELETE',
-            r'reg\s+add\s+([^\s]+)': 'ADD',
-            r'reg\s+delete\s+([^\s]+)': 'DELETE',
-        }
+        for m in master.finditer(script):
+            i, first, groups = _DISPATCH[m.lastgroup]
+            pos = m.start()
+            # findall() semantics: hits of one pattern never overlap each other
+            if pos >= ends[i]:
+                hits[i].append(_match_value(m, first, groups))
+                ends[i] = m.end(first)
+            
+            for j in _SAME_START[i]:
+                if pos < ends[j]:
+                    continue
+                other = singles[j].match(script, pos)
+                if other:
+                    hits[j].append(_match_value(other, 0, singles[j].groups))
+                    ends[j] = other.end()
         
-        for pattern, action in registry_patterns.items():
-            matches = re.findall(pattern, script, re.IGNORECASE)
-            for match in matches:
-                result['registry_affected'].append({
-                    'key': match,
-                    'action': action
-                })
-                result['change_summary'].append(f"{action} registry: {match}")
-        
-        # Analyze process operations
-        process_patterns = {
-            r'Stop-Process\s+.*-Name\s+["\']?([^"\'\s]+)': 'STOP',
-            r'Stop-Process\s+.*-Id\s+(\d+)': 'STOP',
-            r'Start-Process\s+["\']?([^"\']+)': 'START',
-        }
+        # Only the short captured substrings of an ASCII script are decoded
+        if is_bytes:
+            hits = [[_decode_value(value) for value in found] for found in hits]
         
-        for pattern, action in process_patterns.items():
-            matches = re.findall(pattern, script, re.IGNORECASE)
-            for match in matches:
-                result['processes_affected'].append({
-                    'name': match,
-                    'action': action
-                })
-                result['change_summary'].append(f"{action} process: {match}")
-        
-        # Analyze network changes
-        network_patterns = [
-            r'netsh.*firewall',
-            r'netsh.*advfirewall',
-            r'Set-NetFirewallRule',
-            r'New-NetFirewallRule',
-            r'Clear-DnsClientCache',
-            r'ipconfig\s+/flushdns',
-        ]
+        # Counters feed total_changes and the risk score without re-walking lists
+        counts = dict.fromkeys(_RISK_WEIGHTS, 0)
         
-        for pattern in network_patterns:
-            matches = re.findall(pattern, script, re.IGNORECASE)
-            if matches:
-                result['network_changes'].extend(matches)
-                result['change_summary'].append(f"Network change: {matches[0]}")
+        for (key, action, _), found in zip(_SCAN_TABLE, hits):
+            if not found:
+                continue
+            
+            counts[key] += len(found)
+            if key == 'network_changes':
+                result['network_changes'].extend(found)
+                result['change_summary'].append(f"Network change: {found[0]}")
+                continue
+            
+            label = _CATEGORY_FIELDS[key][1]
+            for match in found:
+                value = match if isinstance(match, str) else match[0]
+                result[key].append((action, value))
+                result['change_summary'].append(f"{action} {label}: {value}")
+                
+                if key == 'files_affected' and action == 'DELETE':
+                    counts['file_deletes'] += 1
+                elif key == 'registry_affected' and 'HKLM' in value:
+                    counts['hklm_keys'] += 1
         
         # Calculate total changes
         result['total_changes'] = (
-            len(result['services_affected']) +
-            len(result['files_affected']) +
-            len(result['registry_affected']) +
-            len(result['processes_affected']) +
-            len(result['network_changes'])
+            counts['services_affected'] +
+            counts['files_affected'] +
+            counts['registry_affected'] +
+            counts['processes_affected'] +
+            counts['network_changes']
         )
         
         # Estimate risk level
-        result['estimated_risk'] = DryRunSimulator._calculate_risk(result)
+        result['estimated_risk'] = DryRunSimulator._calculate_risk(counts)
         
         return result
     
     @staticmethod
-    def _calculate_risk(analysis: Dict) -> str:
+    def _calculate_risk(counts: Dict[str, int]) -> str:
         """
         Calculate risk level based on analysis.
         
         Args:
-            analysis: Analysis results
+            counts: Hit counters gathered by _analyze, keyed like _RISK_WEIGHTS
             
         Returns:
             Risk level string
         """
-        total = analysis['total_changes']
-        
-        # Weight different types of changes
-        risk_score = 0
-        risk_score += len(analysis['services_affected']) * 2
-        risk_score += len(analysis['files_affected']) * 3
-        risk_score += len(analysis['registry_affected']) * 4
-        risk_score += len(analysis['processes_affected']) * 1
-        risk_score += len(analysis['network_changes']) * 3
-        
-        # Check for high-risk operations
-        for item in analysis['files_affected']:
-            if item['action'] == 'DELETE':
-                risk_score += 5
-        
-        for item in analysis['registry_affected']:
-            if 'HKLM' in item['key']:
-                risk_score += 5
+        # Weight different types of changes, plus file deletions and HKLM keys
+        risk_score = sum(weight * counts[kind] for kind, weight in _RISK_WEIGHTS.items())
         
         # Determine risk level
         if risk_score == 0:
@@ -185,46 +292,56 @@ class DryRunSimulator:
         Returns:
             Formatted summary string
         """
-        lines = []
-        lines.append("═══ DRY-RUN SIMULATION RESULTS ═══\n")
-        
-        lines.append(f"Total Changes: {analysis['total_changes']}")
-        lines.append(f"Risk Level: {analysis['estimated_risk']}\n")
-        
-        if analysis['services_affected']:
-            lines.append(f"Services ({len(analysis['services_affected'])}):")
-            for svc in analysis['services_affected'][:5]:  # Show first 5
-                lines.append(f"  • {svc['action']}: {svc['name']}")
-            if len(analysis['services_affected']) > 5:
-                lines.append(f"  ... and {len(analysis['services_affected']) - 5} more")
+        lines = [
+            "═══ DRY-RUN SIMULATION RESULTS ═══\n",
+            f"Total Changes: {analysis['total_changes']}",
+            f"Risk Level: {analysis['estimated_risk']}\n",
+        ]
+        
+        services = analysis['services_affected']
+        count = len(services)
+        if count:
+            lines.append(f"Services ({count}):")
+            # Show first 5
+            lines.extend(f"  • {action}: {name}"
+                         for action, name in (services if count <= 5 else services[:5]))
+            if count > 5:
+                lines.append(f"  ... and {count - 5} more")
             lines.append("")
         
-        if analysis['files_affected']:
-            lines.append(f"Files ({len(analysis['files_affected'])}):")
-            for file in analysis['files_affected'][:5]:
-                lines.append(f"  • {file['action']}: {file['path']}")
-            if len(analysis['files_affected']) > 5:
-                lines.append(f"  ... and {len(analysis['files_affected']) - 5} more")
+        files = analysis['files_affected']
+        count = len(files)
+        if count:
+            lines.append(f"Files ({count}):")
+            lines.extend(f"  • {action}: {path}"
+                         for action, path in (files if count <= 5 else files[:5]))
+            if count > 5:
+                lines.append(f"  ... and {count - 5} more")
             lines.append("")
         
-        if analysis['registry_affected']:
-            lines.append(f"Registry ({len(analysis['registry_affected'])}):")
-            for reg in analysis['registry_affected'][:5]:
-                lines.append(f"  • {reg['action']}: {reg['key']}")
-            if len(analysis['registry_affected']) > 5:
-                lines.append(f"  ... and {len(analysis['registry_affected']) - 5} more")
+        registry = analysis['registry_affected']
+        count = len(registry)
+        if count:
+            lines.append(f"Registry ({count}):")
+            lines.extend(f"  • {action}: {key}"
+                         for action, key in (registry if count <= 5 else registry[:5]))
+            if count > 5:
+                lines.append(f"  ... and {count - 5} more")
             lines.append("")
         
-        if analysis['processes_affected']:
-            lines.append(f"Processes ({len(analysis['processes_affected'])}):")
-            for proc in analysis['processes_affected'][:5]:
-                lines.append(f"  • {proc['action']}: {proc['name']}")
+        processes = analysis['processes_affected']
+        count = len(processes)
+        if count:
+            lines.append(f"Processes ({count}):")
+            lines.extend(f"  • {action}: {name}"
+                         for action, name in (processes if count <= 5 else processes[:5]))
             lines.append("")
         
-        if analysis['network_changes']:
-            lines.append(f"Network Changes ({len(analysis['network_changes'])}):")
-            for net in analysis['network_changes'][:3]:
-                lines.append(f"  • {net}")
+        network = analysis['network_changes']
+        count = len(network)
+        if count:
+            lines.append(f"Network Changes ({count}):")
+            lines.extend(f"  • {net}" for net in (network if count <= 3 else network[:3]))
             lines.append("")
         
         return '\n'.join(lines)
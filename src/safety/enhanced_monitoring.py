@@ -1,11 +1,120 @@
 """Enhanced monitoring system for systems without virtualization support."""
 
 import json
+import sys
+import ctypes
 import hashlib
 import subprocess
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+from .powershell import POWERSHELL_EXE, QUERY_FLAGS, PowerShellSession, encoded_command
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional speed-up, stdlib json parses bytes as well
+    orjson = None
+    _json_loads = json.loads
+
+try:
+    import xxhash
+except ImportError:  # optional, blake2b is used instead
+    xxhash = None
+
+try:
+    import winreg
+    import wmi  # pywin32-based; lets snapshots skip PowerShell entirely
+except ImportError:
+    winreg = None
+    wmi = None
+
+
+# Registry keys commonly touched by remediation scripts
+CRITICAL_REGISTRY_KEYS = [
+    r'HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
+    r'HKCU:\SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
+]
+
+# Provider properties Get-ItemProperty adds to every registry key it reads
+_PS_PROVIDER_PROPERTIES = ('PSPath', 'PSParentPath', 'PSChildName', 'PSDrive', 'PSProvider')
+
+# WMI spellings mapped onto the Get-Service names used by the PowerShell path
+_WMI_START_MODES = {'Auto': 'Automatic', 'Manual': 'Manual', 'Disabled': 'Disabled',
+                    'Boot': 'Boot', 'System': 'System'}
+
+# One script collecting every snapshot section; each section fails independently
+SNAPSHOT_SCRIPT = '''
+[Console]::OutputEncoding = New-Object System.Text.UTF8Encoding $false
+$snapshot = @{}
+
+try {
+    $snapshot.services = @(Get-Service -ErrorAction SilentlyContinue |
+        Select-Object Name, @{n='Status';e={"$($_.Status)"}}, @{n='StartType';e={"$($_.StartType)"}})
+} catch { $snapshot.services = @() }
+
+try {
+    $snapshot.startup = @(Get-CimInstance Win32_StartupCommand -ErrorAction Stop | Select-Object Name, Command)
+} catch { $snapshot.startup = @() }
+
+$registry = @{}
+foreach ($key in @(%s)) {
+    try {
+        if (Test-Path $key) {
+            $values = Get-ItemProperty $key -ErrorAction Stop
+            # An existing key without values dumps as {} like the winreg path
+            $registry[$key] = if ($values) {
+                $values | Select-Object * -ExcludeProperty %s | ConvertTo-Json -Compress -Depth 3
+            } else { '{}' }
+        }
+    } catch { }
+}
+$snapshot.registry = $registry
+
+try {
+    $snapshot.system = @{
+        Uptime = (Get-Date) - (gcim Win32_OperatingSystem).LastBootUpTime
+        TotalMemory = (gcim Win32_ComputerSystem).TotalPhysicalMemory
+        FreeMemory = (gcim Win32_OperatingSystem).FreePhysicalMemory
+    }
+} catch { $snapshot.system = @{} }
+
+$snapshot | ConvertTo-Json -Depth 3 -Compress
+''' % (', '.join(f"'{key}'" for key in CRITICAL_REGISTRY_KEYS), ', '.join(_PS_PROVIDER_PROPERTIES))
+
+
+# Static parts of every generated rollback script (timestamp goes in between)
+_ROLLBACK_HEADER = (
+    "# Auto-generated rollback script",
+    "# Generated by SuperDiagnosticTool Enhanced Monitoring",
+)
+_ROLLBACK_PREAMBLE = (
+    "",
+    "$ErrorActionPreference = 'Continue'",
+    "",
+)
+
+# Snapshot sections fingerprinted so unchanged ones can skip the full diff
+HASHED_SECTIONS = ('services', 'startup_items', 'critical_registry')
+
+
+def _section_digest(section) -> int:
+    """Return a 64-bit fingerprint of a JSON-serializable snapshot section."""
+    if orjson:
+        data = orjson.dumps(section, option=orjson.OPT_SORT_KEYS)
+    else:
+        data = json.dumps(section, sort_keys=True, default=str).encode('utf-8')
+    
+    if xxhash:
+        return xxhash.xxh3_64_intdigest(data)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _section_unchanged(pre_snapshot: Dict, post_snapshot: Dict, section: str) -> bool:
+    """True when both snapshots carry the same fingerprint for a section."""
+    pre_hash = pre_snapshot.get('_hashes', {}).get(section)
+    return pre_hash is not None and pre_hash == post_snapshot.get('_hashes', {}).get(section)
+
 
 class EnhancedMonitoring:
     """
@@ -15,140 +124,236 @@ class EnhancedMonitoring:
     - Pre/post execution snapshots
     - Change detection
     - Selective rollback capabilities
+    
+    Use as a context manager to keep one PowerShell session open across the
+    pre/post snapshots; outside of it every snapshot spawns its own process.
     """
     
     def __init__(self):
         self.pre_snapshot = None
         self.post_snapshot = None
         self.changes_detected = []
+        self._session = None
+        self._wmi = None
+        # Set by the first snapshot so later ones read state the same way
+        self._use_native = None
+    
+    def __enter__(self):
+        # A PowerShell session is only worth keeping when WMI is unavailable
+        if wmi is None:
+            session = PowerShellSession()
+            self._session = session if session.start() else None
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._session:
+            self._session.close()
+            self._session = None
+        return False
         
     def take_snapshot(self) -> Dict:
         """
         Take comprehensive snapshot of system state.
         
+        Sections are read in-process through WMI/winreg when the optional
+        wmi package is installed. Otherwise they are collected by a single
+        PowerShell invocation so the interpreter start-up cost is paid once
+        per snapshot. Sections are not fanned out to threads: one batched
+        call already beats several concurrent powershell.exe start-ups.
+        
         Returns:
             Dictionary containing system state
         """
+        state = self._query_system_state()
         snapshot = {
             'timestamp': datetime.now().isoformat(),
-            'services': self._get_services_state(),
-            'startup_items': self._get_startup_items(),
-            'critical_registry': self._get_critical_registry(),
-            'system_info': self._get_system_info()
+            'services': self._parse_services(state.get('services')),
+            'startup_items': self._parse_startup_items(state.get('startup')),
+            'critical_registry': self._parse_registry(state.get('registry')),
+            'system_info': state.get('system') or {}
+        }
+        snapshot['_hashes'] = {
+            section: _section_digest(snapshot[section]) for section in HASHED_SECTIONS
         }
         return snapshot
     
-    def _get_services_state(self) -> Dict[str, str]:
-        """Get state of all Windows services."""
+    def _query_system_state(self) -> Dict:
+        """Collect raw snapshot sections, in-process via WMI when possible."""
+        if self._use_native is not False:
+            state = self._query_native_state()
+            if self._use_native is None:
+                self._use_native = state is not None
+            if state is not None:
+                return state
+        
+        if self._session:
+            output = self._session.run(SNAPSHOT_SCRIPT, timeout=60)
+            if output and output.strip():
+                try:
+                    state = _json_loads(output)
+                    return state if isinstance(state, dict) else {}
+                except ValueError:
+                    pass
+        
         try:
-            ps_cmd = '''
-            Get-Service | Select-Object Name, Status, StartType | ConvertTo-Json
-            '''
-            
-            result = subprocess.run(
-                ["powershell", "-Command", ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=30,
+            # stderr is never used, so only stdout is piped and buffered; no stdin
+            # handle means PowerShell never waits on or probes the console for input
+            process = subprocess.Popen(
+                [POWERSHELL_EXE, *QUERY_FLAGS, *encoded_command(SNAPSHOT_SCRIPT)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 creationflags=subprocess.CREATE_NO_WINDOW
             )
+            try:
+                stdout, _ = process.communicate(timeout=60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                return {}
             
-            if result.returncode == 0 and result.stdout:
-                services = json.loads(result.stdout)
-                if isinstance(services, dict):
-                    services = [services]
-                return {svc['Name']: {'Status': svc['Status'], 'StartType': svc['StartType']} 
-                        for svc in services if svc}
+            # Parse the raw UTF-8 bytes directly - no intermediate str decode
+            if process.returncode == 0 and stdout.strip():
+                state = _json_loads(stdout)
+                return state if isinstance(state, dict) else {}
             return {}
             
         except Exception:
             return {}
     
-    def _get_startup_items(self) -> List[str]:
-        """Get list of startup applications."""
+    def _query_native_state(self) -> Optional[Dict]:
+        """
+        Read snapshot sections through WMI and winreg without spawning PowerShell.
+        
+        Returns:
+            Raw state shaped like the snapshot script output, or None if WMI
+            is not available or the query failed
+        """
+        if wmi is None:
+            return None
+        
         try:
-            ps_cmd = '''
-            Get-CimInstance Win32_StartupCommand | 
-            Select-Object Name, Command | 
-            ConvertTo-Json
-            '''
-            
-            result = subprocess.run(
-                ["powershell", "-Command", ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            if self._wmi is None:
+                self._wmi = wmi.WMI()
+            conn = self._wmi
             
-            if result.returncode == 0 and result.stdout:
-                items = json.loads(result.stdout)
-                if isinstance(items, dict):
-                    items = [items]
-                return [f"{item['Name']}: {item['Command']}" for item in items if item]
-            return []
+            services = [
+                {
+                    'Name': svc.Name,
+                    'Status': (svc.State or '').replace(' ', ''),
+                    'StartType': _WMI_START_MODES.get(svc.StartMode, svc.StartMode)
+                }
+                for svc in conn.Win32_Service(['Name', 'State', 'StartMode'])
+            ]
+            startup = [
+                {'Name': item.Name, 'Command': item.Command}
+                for item in conn.Win32_StartupCommand(['Name', 'Command'])
+            ]
             
+            os_info = conn.Win32_OperatingSystem(['FreePhysicalMemory'])[0]
+            computer = conn.Win32_ComputerSystem(['TotalPhysicalMemory'])[0]
+            system = {
+                'Uptime': {'TotalSeconds': ctypes.windll.kernel32.GetTickCount64() / 1000},
+                'TotalMemory': int(computer.TotalPhysicalMemory),
+                'FreeMemory': int(os_info.FreePhysicalMemory)
+            }
         except Exception:
-            return []
-    
-    def _get_critical_registry(self) -> Dict[str, str]:
-        """Get critical registry keys that might be modified."""
-        critical_keys = [
-            r'HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
-            r'HKCU:\SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
-        ]
+            return None
         
-        registry_state = {}
+        return {
+            'services': services,
+            'startup': startup,
+            'registry': self._read_registry_keys(),
+            'system': system
+        }
+    
+    @staticmethod
+    def _read_registry_keys() -> Dict[str, str]:
+        """Dump the values of each critical registry key that exists as JSON."""
+        hives = {'HKLM': winreg.HKEY_LOCAL_MACHINE, 'HKCU': winreg.HKEY_CURRENT_USER}
+        registry = {}
         
-        for key in critical_keys:
+        for key in CRITICAL_REGISTRY_KEYS:
+            hive_name, _, sub_key = key.partition(':\\')
             try:
-                ps_cmd = f'''
-                if (Test-Path "{key}") {{
-                    Get-ItemProperty "{key}" | ConvertTo-Json
-                }}
-                '''
-                
-                result = subprocess.run(
-                    ["powershell", "-Command", ps_cmd],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    registry_state[key] = result.stdout.strip()
-                    
-            except Exception:
+                # Always read the 64-bit view, like a 64-bit PowerShell would
+                with winreg.OpenKey(hives[hive_name], sub_key, 0,
+                                    winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as handle:
+                    values = {}
+                    index = 0
+                    while True:
+                        try:
+                            name, data, value_type = winreg.EnumValue(handle, index)
+                        except OSError:
+                            break
+                        # Get-ItemProperty returns REG_EXPAND_SZ data expanded
+                        if value_type == winreg.REG_EXPAND_SZ:
+                            data = winreg.ExpandEnvironmentStrings(data)
+                        values[name] = data
+                        index += 1
+            except OSError:
                 continue
+            registry[key] = json.dumps(values, sort_keys=True, default=str)
         
-        return registry_state
+        return registry
     
-    def _get_system_info(self) -> Dict:
-        """Get basic system information."""
-        try:
-            ps_cmd = '''
-            @{
-                Uptime = (Get-Date) - (gcim Win32_OperatingSystem).LastBootUpTime
-                TotalMemory = (gcim Win32_ComputerSystem).TotalPhysicalMemory
-                FreeMemory = (gcim Win32_OperatingSystem).FreePhysicalMemory
-            } | ConvertTo-Json
-            '''
-            
-            result = subprocess.run(
-                ["powershell", "-Command", ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=15,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            if result.returncode == 0 and result.stdout:
-                return json.loads(result.stdout)
+    @staticmethod
+    def _parse_services(services) -> Dict[str, Tuple[str, str]]:
+        """
+        Map service name to its (Status, StartType) tuple.
+        
+        Only a handful of distinct states exist across hundreds of services,
+        so identical tuples are shared; comparing them is then mostly an
+        identity check.
+        """
+        if not services:
             return {}
-            
-        except Exception:
+        if isinstance(services, dict):
+            services = [services]
+        
+        states = {}
+        result = {}
+        for svc in services:
+            if not svc:
+                continue
+            state = (sys.intern(str(svc['Status'])), sys.intern(str(svc['StartType'])))
+            result[svc['Name']] = states.setdefault(state, state)
+        return result
+    
+    @staticmethod
+    def _parse_startup_items(items) -> List[str]:
+        """Flatten startup commands to "Name: Command" strings."""
+        if not items:
+            return []
+        if isinstance(items, dict):
+            items = [items]
+        return [f"{item['Name']}: {item['Command']}" for item in items if item]
+    
+    @staticmethod
+    def _parse_registry(registry) -> Dict[str, str]:
+        """
+        Keep the JSON dump of each critical registry key that exists.
+        
+        Dumps are re-serialized with sorted keys and without provider
+        properties, so the winreg and PowerShell paths compare equal.
+        """
+        if not isinstance(registry, dict):
             return {}
+        
+        result = {}
+        for key, value in registry.items():
+            if not (isinstance(value, str) and value.strip()):
+                continue
+            try:
+                values = json.loads(value)
+            except ValueError:
+                result[key] = value.strip()
+                continue
+            if isinstance(values, dict):
+                values = {name: data for name, data in values.items()
+                          if name not in _PS_PROVIDER_PROPERTIES}
+            result[key] = json.dumps(values, sort_keys=True, default=str)
+        return result
     
     def detect_changes(self, pre_snapshot: Dict, post_snapshot: Dict) -> List[Dict]:
         """
@@ -163,65 +368,67 @@ class EnhancedMonitoring:
         """
         changes = []
         
-        # Detect service changes
-        pre_services = pre_snapshot.get('services', {})
-        post_services = post_snapshot.get('services', {})
+        # Detect service changes (skipped when fingerprints match)
+        if not _section_unchanged(pre_snapshot, post_snapshot, 'services'):
+            pre_services = pre_snapshot.get('services', {})
+            post_services = post_snapshot.get('services', {})
+            
+            # Changed and new services both show up in the post snapshot, so one
+            # pass over it finds them without building any key sets
+            for service_name, post_state in post_services.items():
+                pre_state = pre_services.get(service_name)
+                if service_name not in pre_services:
+                    changes.append({
+                        'type': 'service',
+                        'name': service_name,
+                        'before': None,
+                        'after': post_state
+                    })
+                elif post_state and post_state != pre_state:
+                    changes.append({
+                        'type': 'service',
+                        'name': service_name,
+                        'before': pre_state,
+                        'after': post_state
+                    })
         
-        for service_name, pre_state in pre_services.items():
-            post_state = post_services.get(service_name)
-            if post_state and post_state != pre_state:
+        # Detect startup item changes
+        if not _section_unchanged(pre_snapshot, post_snapshot, 'startup_items'):
+            pre_startup = frozenset(pre_snapshot.get('startup_items', ()))
+            post_startup = frozenset(post_snapshot.get('startup_items', ()))
+            
+            new_items = post_startup - pre_startup
+            removed_items = pre_startup - post_startup
+            
+            for item in new_items:
                 changes.append({
-                    'type': 'service',
-                    'name': service_name,
-                    'before': pre_state,
-                    'after': post_state
+                    'type': 'startup_item',
+                    'action': 'added',
+                    'item': item
                 })
-        
-        # Detect new services
-        for service_name in post_services:
-            if service_name not in pre_services:
+            
+            for item in removed_items:
                 changes.append({
-                    'type': 'service',
-                    'name': service_name,
-                    'before': None,
-                    'after': post_services[service_name]
+                    'type': 'startup_item',
+                    'action': 'removed',
+                    'item': item
                 })
         
-        # Detect startup item changes
-        pre_startup = set(pre_snapshot.get('startup_items', []))
-        post_startup = set(post_snapshot.get('startup_items', []))
-        
-        new_items = post_startup - pre_startup
-        removed_items = pre_startup - post_startup
-        
-        for item in new_items:
-            changes.append({
-                'type': 'startup_item',
-                'action': 'added',
-                'item': item
-            })
-        
-        for item in removed_items:
-            changes.append({
-                'type': 'startup_item',
-                'action': 'removed',
-                'item': item
-            })
-        
         # Detect registry changes
-        pre_registry = pre_snapshot.get('critical_registry', {})
-        post_registry = post_snapshot.get('critical_registry', {})
-        
-        for key in set(list(pre_registry.keys()) + list(post_registry.keys())):
-            pre_val = pre_registry.get(key, '')
-            post_val = post_registry.get(key, '')
-            if pre_val != post_val:
-                changes.append({
-                    'type': 'registry',
-                    'key': key,
-                    'before': pre_val[:100] if pre_val else None,
-                    'after': post_val[:100] if post_val else None
-                })
+        if not _section_unchanged(pre_snapshot, post_snapshot, 'critical_registry'):
+            pre_registry = pre_snapshot.get('critical_registry', {})
+            post_registry = post_snapshot.get('critical_registry', {})
+            
+            for key in pre_registry.keys() | post_registry.keys():
+                pre_val = pre_registry.get(key, '')
+                post_val = post_registry.get(key, '')
+                if pre_val != post_val:
+                    changes.append({
+                        'type': 'registry',
+                        'key': key,
+                        'before': pre_val[:100] if pre_val else None,
+                        'after': post_val[:100] if post_val else None
+                    })
         
         return changes
     
@@ -236,22 +443,18 @@ class EnhancedMonitoring:
             PowerShell script for rollback
         """
         script_lines = [
-            "# Auto-generated rollback script",
-            "# Generated by SuperDiagnosticTool Enhanced Monitoring",
+            *_ROLLBACK_HEADER,
             f"# Timestamp: {datetime.now().isoformat()}",
-            "",
-            "$ErrorActionPreference = 'Continue'",
-            ""
+            *_ROLLBACK_PREAMBLE
         ]
         
         for change in changes:
             if change['type'] == 'service':
                 service_name = change['name']
-                before_state = change.get('before', {})
+                before_state = change.get('before')
                 
                 if before_state:
-                    status = before_state.get('Status', 'Running')
-                    start_type = before_state.get('StartType', 'Automatic')
+                    status, start_type = before_state
                     
                     script_lines.append(f"# Restore service: {service_name}")
                     script_lines.append(f"Set-Service -Name '{service_name}' -StartupType {start_type} -ErrorAction SilentlyContinue")
@@ -284,8 +487,8 @@ class EnhancedMonitoring:
             if change['type'] == 'service':
                 lines.append(f"{i}. Service: {change['name']}")
                 if change.get('before'):
-                    lines.append(f"   Before: {change['before']}")
-                lines.append(f"   After:  {change['after']}")
+                    lines.append(f"   Before: {' / '.join(change['before'])}")
+                lines.append(f"   After:  {' / '.join(change['after'])}")
                 
             elif change['type'] == 'startup_item':
                 lines.append(f"{i}. Startup Item {change['action']}: {change['item']}")
@@ -1,8 +1,73 @@
 """Knowledge base of known solutions for common Windows issues."""
 
+from types import MappingProxyType
 from typing import Dict, List, Optional, Tuple
+import functools
 import re
 
+try:
+    import ahocorasick  # one linear pass finds every symptom keyword
+except ImportError:  # optional, falls back to per-keyword substring checks
+    ahocorasick = None
+
+
+def _lowercase_symptoms(solutions: Dict[str, Dict]) -> Dict[str, Tuple[str, ...]]:
+    """
+    Lowercase and deduplicate the symptom keywords of every solution.
+    
+    Args:
+        solutions: Known solutions keyed by solution ID
+        
+    Returns:
+        Distinct lowercase keywords per solution ID, in their listed order
+    """
+    return {
+        solution_id: tuple(dict.fromkeys(keyword.lower() for keyword in solution['symptoms']))
+        for solution_id, solution in solutions.items()
+    }
+
+
+def _build_keyword_automaton(symptoms: Dict[str, Tuple[str, ...]]):
+    """
+    Build an Aho-Corasick automaton over all symptom keywords.
+    
+    Args:
+        symptoms: Lowercase symptom keywords keyed by solution ID
+        
+    Returns:
+        Automaton mapping each keyword to the solution IDs listing it, or None
+    """
+    if ahocorasick is None:
+        return None
+    
+    owners = {}
+    for solution_id, keywords in symptoms.items():
+        for keyword in keywords:
+            owners.setdefault(keyword, []).append(solution_id)
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, solution_ids in owners.items():
+        automaton.add_word(keyword, (keyword, tuple(solution_ids)))
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_tag_index(solutions: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """
+    Build an inverted index from lowercase tag to solution IDs.
+    
+    Args:
+        solutions: Known solutions keyed by solution ID
+        
+    Returns:
+        Solution IDs per tag, each listed once and in insertion order
+    """
+    index = {}
+    for solution_id, solution in solutions.items():
+        for tag in dict.fromkeys(t.lower() for t in solution.get('tags', [])):
+            index.setdefault(tag, []).append(solution_id)
+    return index
+
 
 class KnowledgeBase:
     """
@@ -22,12 +87,10 @@ class KnowledgeBase:
             "solution": """
 # Stop and disable problematic Intel services
 $services = @('esrv_svc', 'SurSvc', 'esrv')
-foreach ($svc in $services) {
-    if (Get-Service $svc -ErrorAction SilentlyContinue) {
-        Stop-Service $svc -Force -ErrorAction SilentlyContinue
-        Set-Service $svc -StartupType Disabled -ErrorAction SilentlyContinue
-        Write-Host "Disabled service: $svc"
-    }
+Get-Service -Name $services -ErrorAction SilentlyContinue | ForEach-Object {
+    Stop-Service -InputObject $_ -Force -ErrorAction SilentlyContinue
+    Set-Service -Name $_.Name -StartupType Disabled -ErrorAction SilentlyContinue
+    Write-Host "Disabled service: $($_.Name)"
 }
 """,
             "risk_level": "LOW",
@@ -58,17 +121,11 @@ Write-Host "DNS cache cleared"
             "description": "Windows Update service stuck or failing",
             "solution": """
 # Reset Windows Update components
-Stop-Service wuauserv -Force -ErrorAction SilentlyContinue
-Stop-Service cryptSvc -Force -ErrorAction SilentlyContinue
-Stop-Service bits -Force -ErrorAction SilentlyContinue
-Stop-Service msiserver -Force -ErrorAction SilentlyContinue
+Stop-Service -Name wuauserv, cryptSvc, bits, msiserver -Force -ErrorAction SilentlyContinue
 
 Remove-Item C:\\Windows\\SoftwareDistribution\\Download\\* -Recurse -Force -ErrorAction SilentlyContinue
 
-Start-Service wuauserv -ErrorAction SilentlyContinue
-Start-Service cryptSvc -ErrorAction SilentlyContinue
-Start-Service bits -ErrorAction SilentlyContinue
-Start-Service msiserver -ErrorAction SilentlyContinue
+Start-Service -Name wuauserv, cryptSvc, bits, msiserver -ErrorAction SilentlyContinue
 
 Write-Host "Windows Update components reset"
 """,
@@ -107,11 +164,9 @@ Write-Host "Temporary files cleaned"
             "solution": """
 # Restart services that commonly cause memory leaks
 $services = @('Spooler', 'WSearch')
-foreach ($svc in $services) {
-    if (Get-Service $svc -ErrorAction SilentlyContinue) {
-        Restart-Service $svc -Force -ErrorAction SilentlyContinue
-        Write-Host "Restarted service: $svc"
-    }
+Get-Service -Name $services -ErrorAction SilentlyContinue | ForEach-Object {
+    Restart-Service -InputObject $_ -Force -ErrorAction SilentlyContinue
+    Write-Host "Restarted service: $($_.Name)"
 }
 """,
             "risk_level": "LOW",
@@ -122,6 +177,22 @@ foreach ($svc in $services) {
         }
     }
     
+    # Symptom keywords are static: lowercased and deduplicated once
+    _SYMPTOMS_LOWER = _lowercase_symptoms(KNOWN_SOLUTIONS)
+    _KEYWORD_AUTOMATON = _build_keyword_automaton(_SYMPTOMS_LOWER)
+    
+    # Whitespace and comments, merged so one substitution pass normalizes a script
+    _NORMALIZE_RE = re.compile(r'(?:\s|#[^\n]*)+')
+    
+    # Leading command word of a line; '#' never matches, so comments are skipped
+    _COMMAND_RE = re.compile(r'^\s*([A-Za-z][A-Za-z0-9-]*)', re.MULTILINE)
+    
+    # Command sets of the static known solutions, filled in once at import
+    _SOLUTION_COMMANDS: Dict[str, frozenset] = {}
+    
+    # Lowercase tag -> solution IDs, in KNOWN_SOLUTIONS order
+    _TAG_INDEX = _build_tag_index(KNOWN_SOLUTIONS)
+    
     @classmethod
     def find_matching_solution(cls, symptoms: str, telemetry: Dict = None) -> Optional[Dict]:
         """
@@ -135,17 +206,15 @@ foreach ($svc in $services) {
             Matching solution dict or None
         """
         symptoms_lower = symptoms.lower()
+        keyword_scores = cls._score_keywords(symptoms_lower)
         
-        best_match = None
+        best_id = None
         best_score = 0
         
-        for solution_id, solution in cls.KNOWN_SOLUTIONS.items():
-            score = 0
-            
+        solutions = cls.KNOWN_SOLUTIONS
+        for solution_id in solutions:
             # Check symptom keywords
-            for keyword in solution['symptoms']:
-                if keyword.lower() in symptoms_lower:
-                    score += 1
+            score = keyword_scores.get(solution_id, 0)
             
             # Check telemetry if available
             if telemetry:
@@ -154,18 +223,60 @@ foreach ($svc in $services) {
             
             if score > best_score:
                 best_score = score
-                best_match = {
-                    'id': solution_id,
-                    'match_score': score,
-                    **solution
-                }
+                best_id = solution_id
         
         # Return only if match score is significant
         if best_score >= 2:
-            return best_match
+            return {
+                'id': best_id,
+                'match_score': best_score,
+                **solutions[best_id]
+            }
         
         return None
     
+    @classmethod
+    def _score_keywords(cls, symptoms_lower: str) -> Dict[str, int]:
+        """
+        Count the distinct symptom keywords found for each solution.
+        
+        Args:
+            symptoms_lower: Lowercased problem description
+            
+        Returns:
+            Keyword hit count per solution ID (solutions without hits omitted).
+            Without the automaton, a solution that can no longer beat an
+            earlier one (or reach the minimum score of 2) stops counting early.
+        """
+        scores = {}
+        
+        if cls._KEYWORD_AUTOMATON is not None:
+            found = {keyword: owners for _, (keyword, owners) in cls._KEYWORD_AUTOMATON.iter(symptoms_lower)}
+            for owners in found.values():
+                for solution_id in owners:
+                    scores[solution_id] = scores.get(solution_id, 0) + 1
+            return scores
+        
+        # Ties go to the earlier solution, so dict order is kept and only
+        # the keyword loop is pruned once its best case cannot win
+        best_score = 1
+        found = {}  # keywords shared by several solutions are tested once
+        for solution_id, keywords in cls._SYMPTOMS_LOWER.items():
+            score = 0
+            for i, keyword in enumerate(keywords):
+                if score + len(keywords) - i <= best_score:
+                    break
+                hit = found.get(keyword)
+                if hit is None:
+                    hit = found[keyword] = keyword in symptoms_lower
+                if hit:
+                    score += 1
+            
+            if score:
+                scores[solution_id] = score
+            best_score = max(best_score, score)
+        return scores
+    
     @classmethod
     def validate_ai_solution(cls, ai_script: str, symptoms: str) -> Tuple[bool, str, Optional[Dict]]:
         """
@@ -185,7 +296,7 @@ foreach ($svc in $services) {
             return True, "No known solution - AI solution accepted", None
         
         # Check if AI solution is similar to known solution
-        similarity = cls._calculate_similarity(ai_script, known['solution'])
+        similarity = cls._jaccard(cls._command_set(ai_script), cls._SOLUTION_COMMANDS[known['id']])
         
         if similarity > 0.7:
             return True, f"Matches known solution '{known['id']}' ({similarity*100:.0f}% similar)", known
@@ -206,18 +317,20 @@ foreach ($svc in $services) {
         Returns:
             Similarity score (0.0 to 1.0)
         """
-        # Normalize scripts
-        s1 = cls._normalize_script(script1)
-        s2 = cls._normalize_script(script2)
-        
-        # Extract commands
-        commands1 = set(cls._extract_commands(s1))
-        commands2 = set(cls._extract_commands(s2))
-        
+        return cls._jaccard(cls._command_set(script1), cls._command_set(script2))
+    
+    @classmethod
+    @functools.lru_cache(maxsize=512)
+    def _command_set(cls, script: str) -> frozenset:
+        """Normalize a script and return the set of commands it uses (memoized)."""
+        return frozenset(cls._extract_commands(cls._normalize_script(script)))
+    
+    @staticmethod
+    def _jaccard(commands1: frozenset, commands2: frozenset) -> float:
+        """Jaccard similarity of two command sets (0.0 if either is empty)."""
         if not commands1 or not commands2:
             return 0.0
         
-        # Calculate Jaccard similarity
         intersection = len(commands1 & commands2)
         union = len(commands1 | commands2)
         
@@ -226,26 +339,26 @@ foreach ($svc in $services) {
     @classmethod
     def _normalize_script(cls, script: str) -> str:
         """Normalize PowerShell script for comparison."""
-        # Remove comments
-        script = re.sub(r'#.*$', '', script, flags=re.MULTILINE)
-        # Remove extra whitespace
-        script = re.sub(r'\s+', ' ', script)
-        # Convert to lowercase
-        return script.lower().strip()
+        # Remove comments and collapse whitespace in one pass, then lowercase
+        return cls._NORMALIZE_RE.sub(cls._normalize_run, script).lower().strip()
+    
+    @staticmethod
+    def _normalize_run(match) -> str:
+        """
+        Replacement for a run of whitespace and comments.
+        
+        A comment always ends at a newline or at the end of the script, so a
+        run holds whitespace outside comments unless it is a single trailing
+        comment: that one vanishes, anything else becomes one space.
+        """
+        run = match.group()
+        return '' if run[0] == '#' and '\n' not in run else ' '
     
     @classmethod
     def _extract_commands(cls, script: str) -> List[str]:
         """Extract PowerShell commands from script."""
-        # Simple command extraction
-        commands = []
-        for line in script.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('#'):
-                # Extract first word (command)
-                match = re.match(r'^([A-Za-z][A-Za-z0-9-]*)', line)
-                if match:
-                    commands.append(match.group(1).lower())
-        return commands
+        # First word of every non-comment line, found in one scan
+        return [match.group(1).lower() for match in cls._COMMAND_RE.finditer(script)]
     
     @classmethod
     def get_solution_by_id(cls, solution_id: str) -> Optional[Dict]:
@@ -264,7 +377,15 @@ foreach ($svc in $services) {
     def get_solutions_by_tag(cls, tag: str) -> List[Dict]:
         """Get solutions by tag."""
         return [
-            {'id': sid, **solution}
-            for sid, solution in cls.KNOWN_SOLUTIONS.items()
-            if tag.lower() in [t.lower() for t in solution.get('tags', [])]
+            {'id': sid, **cls.KNOWN_SOLUTIONS[sid]}
+            for sid in cls._TAG_INDEX.get(tag.lower(), ())
         ]
+
+
+KnowledgeBase._SOLUTION_COMMANDS.update(
+    (solution_id, KnowledgeBase._command_set(solution['solution']))
+    for solution_id, solution in KnowledgeBase.KNOWN_SOLUTIONS.items()
+)
+
+# Read-only from here on; the derived tables above are built from it once
+KnowledgeBase.KNOWN_SOLUTIONS = MappingProxyType(KnowledgeBase.KNOWN_SOLUTIONS)
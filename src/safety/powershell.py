@@ -0,0 +1,196 @@
+"""Persistent PowerShell session for running many commands without respawning."""
+
+import base64
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+
+# PowerShell 7 starts noticeably faster than Windows PowerShell 5.1
+POWERSHELL_EXE = shutil.which("pwsh") or "powershell"
+
+# Skip profile loading, prompts and policy checks on every spawn
+POWERSHELL_FLAGS = ["-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass"]
+
+# Multi-threaded apartment for the CIM-heavy query processes; Windows PowerShell
+# defaults to STA and pays COM apartment set-up for every Get-CimInstance
+QUERY_FLAGS = [*POWERSHELL_FLAGS, "-MTA"]
+
+
+def encoded_command(script: str) -> List[str]:
+    """
+    Build the ``-EncodedCommand`` arguments for a one-off PowerShell process.
+    
+    The script travels as base64 UTF-16LE, so it needs no command-line quoting
+    and is parsed once by PowerShell itself.
+    
+    Args:
+        script: PowerShell script content
+    
+    Returns:
+        Arguments to append to the PowerShell command line
+    """
+    return ["-EncodedCommand", base64.b64encode(script.encode('utf-16-le')).decode('ascii')]
+
+
+class PowerShellSession:
+    """
+    Long-lived PowerShell process fed through stdin.
+    
+    Every call is sent as one base64-encoded line followed by a unique end
+    marker, so results are collected without paying interpreter start-up
+    and JIT warm-up again. Scripts run inside a scriptblock and must not
+    call ``exit`` (that would end the shared session).
+    """
+    
+    def __init__(self, executable: str = POWERSHELL_EXE):
+        """
+        Initialize the session (the process is started lazily).
+        
+        Args:
+            executable: PowerShell binary, pwsh when available by default
+        """
+        self._executable = executable
+        self._process = None
+        self._lines = None
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    @property
+    def is_alive(self) -> bool:
+        """True while the PowerShell child process is running."""
+        return self._process is not None and self._process.poll() is None
+    
+    def start(self) -> bool:
+        """
+        Spawn the PowerShell process if it is not already running.
+        
+        Returns:
+            True if a session is available, False otherwise
+        """
+        if self.is_alive:
+            return True
+        
+        try:
+            self._process = subprocess.Popen(
+                [self._executable, "-NoLogo", *QUERY_FLAGS, "-Command", "-"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+            # Emit UTF-8 without BOM so output decodes the same on every locale
+            self._process.stdin.write(
+                "[Console]::OutputEncoding = New-Object System.Text.UTF8Encoding $false\n"
+            )
+            self._process.stdin.flush()
+        except Exception:
+            self._process = None
+            return False
+        
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=self._pump,
+            args=(self._process.stdout, self._lines),
+            daemon=True
+        ).start()
+        return True
+    
+    def run(self, script: str, timeout: float = 60) -> Optional[str]:
+        """
+        Run a script in the session and return its standard output.
+        
+        Args:
+            script: PowerShell script content
+            timeout: Maximum time to wait for the end marker in seconds
+        
+        Returns:
+            Captured output, or None if the session failed or timed out
+        """
+        with self._lock:
+            if not self.start():
+                return None
+            
+            marker = f"__END__{uuid.uuid4().hex}"
+            payload = base64.b64encode(script.encode('utf-8')).decode('ascii')
+            command = (
+                "try { & ([scriptblock]::Create([System.Text.Encoding]::UTF8.GetString("
+                f"[System.Convert]::FromBase64String('{payload}')))) }} catch {{ }}; "
+                f"Write-Output '{marker}'\n"
+            )
+            
+            try:
+                self._process.stdin.write(command)
+                self._process.stdin.flush()
+            except (OSError, ValueError):
+                self._terminate()
+                return None
+            
+            output = []
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise queue.Empty
+                    line = self._lines.get(timeout=remaining)
+                except queue.Empty:
+                    # Session state is unknown after a timeout - start fresh next time
+                    self._terminate()
+                    return None
+                
+                if line is None:
+                    self._terminate()
+                    return None
+                if marker in line:
+                    return ''.join(output)
+                output.append(line)
+    
+    def close(self):
+        """Ask the session to exit, killing it if it does not comply."""
+        with self._lock:
+            if self._process is None:
+                return
+            try:
+                self._process.stdin.write("exit\n")
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            except Exception:
+                pass
+            self._terminate()
+    
+    def _terminate(self):
+        """Kill the child process and forget it."""
+        if self._process is not None:
+            try:
+                if self._process.poll() is None:
+                    self._process.kill()
+            except Exception:
+                pass
+        self._process = None
+        self._lines = None
+    
+    @staticmethod
+    def _pump(stream, lines):
+        """Forward stdout lines to the queue; None signals end of stream."""
+        try:
+            for line in stream:
+                lines.put(line)
+        except Exception:
+            pass
+        lines.put(None)
@@ -1,16 +1,58 @@
 """System Restore Point Manager for safe system modifications."""
 
+import asyncio
+import atexit
 import subprocess
 import datetime
 import json
 from typing import Tuple, Optional
 
+from .powershell import QUERY_FLAGS, PowerShellSession, encoded_command
+
 
 class RestorePointManager:
     """Manages Windows System Restore Points for safe rollback."""
     
-    @staticmethod
-    def create_restore_point(description: str = "SuperDiagnostic Auto-Backup") -> Tuple[bool, str]:
+    # Checkpoint-Computer and friends only ship with Windows PowerShell 5.1, not pwsh
+    _session: Optional[PowerShellSession] = None
+    
+    # Latest SuperDiagnostic restore point as JSON
+    _LATEST_SCRIPT = '''
+    $rp = Get-ComputerRestorePoint | 
+        Where-Object {$_.Description -like "*SuperDiagnostic*"} | 
+        Sort-Object CreationTime -Descending | 
+        Select-Object -First 1 |
+        Select-Object Description, CreationTime, SequenceNumber |
+        ConvertTo-Json
+    Write-Output $rp
+    '''
+    
+    @classmethod
+    def _run(cls, ps_cmd: str, timeout: float) -> str:
+        """
+        Run a command in the shared Windows PowerShell session.
+        
+        Args:
+            ps_cmd: PowerShell script content (must not call exit)
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            Captured standard output
+            
+        Raises:
+            subprocess.TimeoutExpired: If no result arrived in time
+        """
+        if cls._session is None:
+            cls._session = PowerShellSession("powershell")
+            atexit.register(cls._session.close)
+        
+        output = cls._session.run(ps_cmd, timeout=timeout)
+        if output is None:
+            raise subprocess.TimeoutExpired("powershell", timeout)
+        return output
+    
+    @classmethod
+    def create_restore_point(cls, description: str = "SuperDiagnostic Auto-Backup") -> Tuple[bool, str]:
         """
         Create a system restore point before any changes.
         
@@ -30,22 +72,15 @@ class RestorePointManager:
                 Write-Output "SUCCESS"
             }} catch {{
                 Write-Output "FAILED: $_"
-                exit 1
             }}
             '''
             
-            result = subprocess.run(
-                ["powershell", "-Command", ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=120,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            output = cls._run(ps_cmd, timeout=120)
             
-            if result.returncode == 0 and "SUCCESS" in result.stdout:
+            if "SUCCESS" in output:
                 return True, full_desc
             else:
-                error_msg = result.stderr or result.stdout or "Unknown error"
+                error_msg = output or "Unknown error"
                 return False, error_msg.strip()
                 
         except subprocess.TimeoutExpired:
@@ -54,7 +89,18 @@ class RestorePointManager:
             return False, f"Exception: {str(e)}"
     
     @staticmethod
-    def verify_restore_point_exists(description: Optional[str] = None) -> bool:
+    def _verify_script(description: Optional[str]) -> str:
+        """Build the lookup script for verify_restore_point_exists."""
+        pattern = description or "SuperDiagnostic"
+        return f'''
+        $rp = Get-ComputerRestorePoint | 
+            Where-Object {{$_.Description -like "*{pattern}*"}} | 
+            Select-Object -First 1
+        if ($rp) {{ Write-Output "EXISTS" }} else {{ Write-Output "NOT_FOUND" }}
+        '''
+    
+    @classmethod
+    def verify_restore_point_exists(cls, description: Optional[str] = None) -> bool:
         """
         Verify that a restore point was created successfully.
         
@@ -65,36 +111,12 @@ class RestorePointManager:
             True if restore point exists, False otherwise
         """
         try:
-            if description:
-                ps_cmd = f'''
-                $rp = Get-ComputerRestorePoint | 
-                    Where-Object {{$_.Description -like "*{description}*"}} | 
-                    Select-Object -First 1
-                if ($rp) {{ Write-Output "EXISTS" }} else {{ Write-Output "NOT_FOUND" }}
-                '''
-            else:
-                ps_cmd = '''
-                $rp = Get-ComputerRestorePoint | 
-                    Where-Object {$_.Description -like "*SuperDiagnostic*"} | 
-                    Select-Object -First 1
-                if ($rp) { Write-Output "EXISTS" } else { Write-Output "NOT_FOUND" }
-                '''
-            
-            result = subprocess.run(
-                ["powershell", "-Command", ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-            
-            return "EXISTS" in result.stdout
-            
+            return "EXISTS" in cls._run(cls._verify_script(description), timeout=30)
         except Exception:
             return False
     
-    @staticmethod
-    def get_latest_restore_point() -> Optional[dict]:
+    @classmethod
+    def get_latest_restore_point(cls) -> Optional[dict]:
         """
         Get information about the latest SuperDiagnostic restore point.
         
@@ -102,33 +124,92 @@ class RestorePointManager:
             Dictionary with restore point info or None
         """
         try:
-            ps_cmd = '''
-            $rp = Get-ComputerRestorePoint | 
-                Where-Object {$_.Description -like "*SuperDiagnostic*"} | 
-                Sort-Object CreationTime -Descending | 
-                Select-Object -First 1 |
-                Select-Object Description, CreationTime, SequenceNumber |
-                ConvertTo-Json
-            Write-Output $rp
-            '''
+            output = cls._run(cls._LATEST_SCRIPT, timeout=30)
             
-            result = subprocess.run(
-                ["powershell", "-Command", ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            if output.strip():
+                return json.loads(output)
+            return None
+            
+        except Exception:
+            return None
+    
+    # Piped output is otherwise written in the OEM code page; the shared session sets this too
+    _UTF8_OUTPUT = "[Console]::OutputEncoding = New-Object System.Text.UTF8Encoding $false\n"
+    
+    @classmethod
+    async def _run_async(cls, ps_cmd: str, timeout: float) -> bytes:
+        """
+        Run a command in its own Windows PowerShell process without blocking.
+        
+        Args:
+            ps_cmd: PowerShell script content
+            timeout: Maximum time to wait in seconds
             
-            if result.returncode == 0 and result.stdout.strip():
-                return json.loads(result.stdout)
+        Returns:
+            Captured standard output as undecoded UTF-8 bytes
+            
+        Raises:
+            subprocess.TimeoutExpired: If the process did not finish in time
+        """
+        process = await asyncio.create_subprocess_exec(
+            "powershell", *QUERY_FLAGS, *encoded_command(cls._UTF8_OUTPUT + ps_cmd),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired("powershell", timeout)
+        return stdout
+    
+    @classmethod
+    async def verify_restore_point_exists_async(cls, description: Optional[str] = None) -> bool:
+        """Async variant of verify_restore_point_exists (separate process)."""
+        try:
+            return b"EXISTS" in await cls._run_async(cls._verify_script(description), timeout=30)
+        except Exception:
+            return False
+    
+    @classmethod
+    async def get_latest_restore_point_async(cls) -> Optional[dict]:
+        """Async variant of get_latest_restore_point (separate process)."""
+        try:
+            output = await cls._run_async(cls._LATEST_SCRIPT, timeout=30)
+            
+            if output.strip():
+                return json.loads(output.decode('utf-8', errors='replace'))
             return None
             
         except Exception:
             return None
     
-    @staticmethod
-    def restore_to_point(sequence_number: int) -> Tuple[bool, str]:
+    @classmethod
+    def check_restore_points(cls, description: Optional[str] = None) -> Tuple[bool, Optional[dict]]:
+        """
+        Verify a restore point and fetch the latest one concurrently.
+        
+        Args:
+            description: Optional description to search for
+            
+        Returns:
+            (exists, latest): Same results as verify_restore_point_exists
+            and get_latest_restore_point, in about the time of one call
+        """
+        async def gather():
+            return await asyncio.gather(
+                cls.verify_restore_point_exists_async(description),
+                cls.get_latest_restore_point_async()
+            )
+        
+        exists, latest = asyncio.run(gather())
+        return exists, latest
+    
+    @classmethod
+    def restore_to_point(cls, sequence_number: int) -> Tuple[bool, str]:
         """
         Restore system to a specific restore point.
         
@@ -145,22 +226,15 @@ class RestorePointManager:
                 Write-Output "RESTORE_INITIATED"
             }} catch {{
                 Write-Output "FAILED: $_"
-                exit 1
             }}
             '''
             
-            result = subprocess.run(
-                ["powershell", "-Command", ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=60,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            output = cls._run(ps_cmd, timeout=60)
             
-            if result.returncode == 0 and "RESTORE_INITIATED" in result.stdout:
+            if "RESTORE_INITIATED" in output:
                 return True, "System restore initiated. Computer will restart."
             else:
-                error_msg = result.stderr or result.stdout or "Unknown error"
+                error_msg = output or "Unknown error"
                 return False, error_msg.strip()
                 
         except Exception as e:
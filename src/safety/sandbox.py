@@ -1,11 +1,35 @@
 """Sandbox executor for safe PowerShell script execution with monitoring."""
 
+import re
 import subprocess
-import tempfile
 import os
 from pathlib import Path
 from typing import Tuple, Optional
 
+from .powershell import POWERSHELL_FLAGS
+
+
+# Reads the whole script from stdin as UTF-8 and runs it as one scriptblock, so
+# nothing touches disk and multi-line statements are not split up the way
+# "-Command -" interactive parsing would; exit codes still reach the process
+STDIN_LOADER = (
+    "[Console]::OutputEncoding = New-Object System.Text.UTF8Encoding $false; "
+    "$reader = New-Object System.IO.StreamReader([Console]::OpenStandardInput(), "
+    "[System.Text.Encoding]::UTF8); "
+    "& ([scriptblock]::Create($reader.ReadToEnd()))"
+)
+
+# Start of every line holding non-whitespace; blank lines stay untouched
+_CONTENT_LINE_RE = re.compile(r'^(?=[^\S\n]*\S)', re.MULTILINE)
+
+
+def _decode_output(data: bytes) -> str:
+    """Decode captured UTF-8 output once, normalizing Windows line endings."""
+    if not data:
+        return ""
+    text = data.decode('utf-8', errors='replace')
+    return text.replace('\r\n', '\n') if b'\r' in data else text
+
 
 class SandboxExecutor:
     """Execute PowerShell scripts with monitoring and safety limits."""
@@ -30,49 +54,29 @@ class SandboxExecutor:
         Returns:
             (success, stdout, stderr): Execution results
         """
-        script_path = None
-        
         try:
-            # Create temporary script file with monitoring wrapper
-            with tempfile.NamedTemporaryFile(
-                mode='w',
-                suffix='.ps1',
-                delete=False,
-                encoding='utf-8'
-            ) as f:
-                wrapped_script = self._wrap_with_monitoring(self.script)
-                f.write(wrapped_script)
-                script_path = f.name
+            wrapped_script = self._wrap_with_monitoring(self.script)
             
-            # Execute with constraints
+            # Execute with constraints, streaming the script over stdin
             result = subprocess.run(
                 [
                     "powershell",
-                    "-ExecutionPolicy", "Bypass",
-                    "-NoProfile",
-                    "-NonInteractive",
-                    "-File", script_path
+                    *POWERSHELL_FLAGS,
+                    "-Command", STDIN_LOADER
                 ],
+                input=wrapped_script.encode('utf-8'),
                 capture_output=True,
-                text=True,
                 timeout=timeout,
                 creationflags=subprocess.CREATE_NO_WINDOW
             )
             
             success = result.returncode == 0
-            return success, result.stdout, result.stderr
+            return success, _decode_output(result.stdout), _decode_output(result.stderr)
             
         except subprocess.TimeoutExpired:
             return False, "", f"Script execution timeout after {timeout} seconds"
         except Exception as e:
             return False, "", f"Execution error: {str(e)}"
-        finally:
-            # Cleanup temporary file
-            if script_path and os.path.exists(script_path):
-                try:
-                    os.unlink(script_path)
-                except:
-                    pass
     
     def _wrap_with_monitoring(self, script: str) -> str:
         """
@@ -92,11 +96,16 @@ $ProgressPreference = "SilentlyContinue"
 # Execution log
 $LogFile = "$env:TEMP\\superdiagnostic_execution_$(Get-Date -Format 'yyyyMMdd_HHmmss').log"
 
+# One handle for the whole run instead of an open/write/close per line;
+# AutoFlush keeps the log complete even if the script is killed on timeout
+$LogStream = [System.IO.File]::AppendText($LogFile)
+$LogStream.AutoFlush = $true
+
 function Log-Action {{
     param([string]$Message)
     $timestamp = Get-Date -Format "yyyy-MM-dd HH:mm:ss"
     $logEntry = "$timestamp : $Message"
-    Add-Content -Path $LogFile -Value $logEntry
+    $LogStream.WriteLine($logEntry)
     Write-Host $logEntry
 }}
 
@@ -104,7 +113,7 @@ function Log-Error {{
     param([string]$Message)
     $timestamp = Get-Date -Format "yyyy-MM-dd HH:mm:ss"
     $logEntry = "$timestamp : ERROR: $Message"
-    Add-Content -Path $LogFile -Value $logEntry
+    $LogStream.WriteLine($logEntry)
     Write-Error $logEntry
 }}
 
@@ -133,6 +142,7 @@ catch {{
 }}
 finally {{
     Log-Action "Execution log saved to: $LogFile"
+    $LogStream.Close()
 }}
 '''
         return wrapper
@@ -148,10 +158,7 @@ finally {{
         Returns:
             Indented script
         """
-        indent = ' ' * spaces
-        lines = script.split('\n')
-        indented_lines = [indent + line if line.strip() else line for line in lines]
-        return '\n'.join(indented_lines)
+        return _CONTENT_LINE_RE.sub(' ' * spaces, script)
     
     @staticmethod
     def get_last_execution_log() -> Optional[str]:
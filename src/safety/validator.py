@@ -1,7 +1,63 @@
 """Multi-level PowerShell script validation system."""
 
 import re
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
+
+from ._regex import fuse_patterns, same_start
+
+try:
+    import hyperscan  # SIMD multi-pattern DFA, scans every pattern in one pass
+except ImportError:  # optional, the fused re alternations are used instead
+    hyperscan = None
+
+
+def _compile_hyperscan(patterns: List[str]):
+    """
+    Compile patterns into one Hyperscan block-mode database.
+    
+    Args:
+        patterns: Regex sources, reported back by their list index
+        
+    Returns:
+        Compiled database, or None when Hyperscan is unavailable
+    """
+    if hyperscan is None:
+        return None
+    
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[p.encode('utf-8') for p in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_MULTILINE
+                   | hyperscan.HS_FLAG_SINGLEMATCH] * len(patterns)
+        )
+        return database
+    except Exception:
+        return None
+
+
+def _linearize(pattern: str) -> str:
+    """
+    Rewrite the ``.*`` gaps of a multi-gap boolean pattern as tempered tokens.
+    
+    ``A.*B.*C`` backtracks over every B/C combination on a long line;
+    ``A(?:(?!B).)*B(?:(?!C).)*C`` can only stop at the first B and then
+    at the first C, so a start position costs one pass over the line. For
+    a yes/no search both forms match exactly the same scripts. Single-gap
+    patterns are already linear per start position and are left alone.
+    
+    Args:
+        pattern: Regex source whose ``.*`` gaps separate literal-like parts
+        
+    Returns:
+        Equivalent pattern without nested backtracking
+    """
+    head, *parts = re.split(r'(?<!\\)\.\*', pattern)
+    if len(parts) < 2:
+        return pattern
+    return head + ''.join(rf'(?:(?!{part})[^\n])*{part}' for part in parts)
 
 
 class ScriptValidator:
@@ -142,6 +198,57 @@ class ScriptValidator:
         r'System\.Net\.WebClient',
     ]
     
+    # Compiled once at class creation so validate() only pays for matching
+    # (blacklist/suspicious checks are yes/no, so their '.*' gaps are linearized)
+    _BLACKLIST_RE = tuple(re.compile(_linearize(p), re.IGNORECASE | re.MULTILINE) for p in BLACKLIST)
+    _SUSPICIOUS_RE = tuple(re.compile(_linearize(p), re.IGNORECASE) for p in SUSPICIOUS_PATTERNS)
+    _RISKY_RE = tuple(re.compile(p, re.IGNORECASE) for p in RISKY_PATTERNS)
+    _COMMAND_RE = re.compile(r'^([A-Za-z][A-Za-z0-9-]*)')
+    _WHITELIST_SET = frozenset(WHITELIST_COMMANDS)
+    
+    # One alternation per category: a single scan tells whether anything fired
+    _BLACKLIST_UNION = re.compile(
+        "|".join(f"(?P<b{i}>{p.pattern})" for i, p in enumerate(_BLACKLIST_RE)),
+        re.IGNORECASE | re.MULTILINE
+    )
+    _SUSPICIOUS_UNION = re.compile(
+        "|".join(f"(?P<s{i}>{p.pattern})" for i, p in enumerate(_SUSPICIOUS_RE)),
+        re.IGNORECASE
+    )
+    
+    # Risky patterns as parallel arrays plus one fused lookahead scanner, so a
+    # single finditer() pass yields the per-pattern findall() counts
+    _RISKY_SCORES = tuple(RISKY_PATTERNS.values())
+    _RISKY_UNION = re.compile(fuse_patterns(list(RISKY_PATTERNS)), re.IGNORECASE)
+    _RISKY_SAME_START = same_start(list(RISKY_PATTERNS))
+    
+    # Blacklist ids come first, suspicious ids follow; MULTILINE only affects the blacklist '$' anchors
+    _HYPERSCAN_DB = _compile_hyperscan(BLACKLIST + SUSPICIOUS_PATTERNS)
+    
+    @classmethod
+    def _hyperscan_hits(cls, script: str) -> Optional[List[int]]:
+        """
+        Scan blacklist and suspicious patterns together with Hyperscan.
+        
+        Args:
+            script: PowerShell script content
+            
+        Returns:
+            Sorted indices of the patterns that matched, or None to fall back to re
+        """
+        if cls._HYPERSCAN_DB is None:
+            return None
+        
+        fired = set()
+        try:
+            cls._HYPERSCAN_DB.scan(
+                script.encode('utf-8'),
+                match_event_handler=lambda pid, start, end, flags, ctx: fired.add(pid)
+            )
+        except Exception:
+            return None
+        return sorted(fired)
+    
     @classmethod
     def validate(cls, script: str) -> Tuple[bool, List[str], int]:
         """
@@ -157,17 +264,33 @@ class ScriptValidator:
         risk_score = 0
         
         # Level 1: Check blacklist (absolute blocking)
-        for pattern in cls.BLACKLIST:
-            matches = re.findall(pattern, script, re.IGNORECASE | re.MULTILINE)
-            if matches:
-                return False, [f"BLOCKED: Dangerous pattern detected: {pattern}"], 100
-        
-        # Check suspicious patterns
-        for pattern in cls.SUSPICIOUS_PATTERNS:
-            matches = re.findall(pattern, script, re.IGNORECASE)
-            if matches:
+        hits = cls._hyperscan_hits(script)
+        if hits is not None:
+            blacklist_count = len(cls.BLACKLIST)
+            if hits and hits[0] < blacklist_count:
+                return False, [f"BLOCKED: Dangerous pattern detected: {cls.BLACKLIST[hits[0]]}"], 100
+            
+            for index in hits:
+                pattern = cls.SUSPICIOUS_PATTERNS[index - blacklist_count]
                 warnings.append(f"SUSPICIOUS: Potentially malicious pattern: {pattern}")
                 risk_score += 10
+        else:
+            hit = cls._BLACKLIST_UNION.search(script)
+            if hit:
+                # Report the first listed pattern that matches anywhere, as before
+                fired = int(hit.lastgroup[1:])
+                for index in range(fired):
+                    if cls._BLACKLIST_RE[index].search(script):
+                        fired = index
+                        break
+                return False, [f"BLOCKED: Dangerous pattern detected: {cls.BLACKLIST[fired]}"], 100
+            
+            # Check suspicious patterns (individually only once the union fired)
+            if cls._SUSPICIOUS_UNION.search(script):
+                for pattern, compiled in zip(cls.SUSPICIOUS_PATTERNS, cls._SUSPICIOUS_RE):
+                    if compiled.search(script):
+                        warnings.append(f"SUSPICIOUS: Potentially malicious pattern: {pattern}")
+                        risk_score += 10
         
         # Level 2: Check if commands are whitelisted
         lines = script.split('\n')
@@ -179,21 +302,36 @@ class ScriptValidator:
                 continue
             
             # Extract command (first word)
-            cmd_match = re.match(r'^([A-Za-z][A-Za-z0-9-]*)', line)
+            cmd_match = cls._COMMAND_RE.match(line)
             if cmd_match:
                 cmd = cmd_match.group(1)
-                if cmd not in cls.WHITELIST_COMMANDS and not cmd.startswith('$'):
+                if cmd not in cls._WHITELIST_SET and not cmd.startswith('$'):
                     non_whitelisted_count += 1
                     warnings.append(f"Non-whitelisted command: {cmd} in line: {line[:50]}")
                     risk_score += 2
         
         # Level 3: Calculate risk score from patterns
-        for pattern, score in cls.RISKY_PATTERNS.items():
-            matches = re.findall(pattern, script, re.IGNORECASE)
-            if matches:
-                count = len(matches)
+        counts = [0] * len(cls._RISKY_SCORES)
+        ends = [0] * len(cls._RISKY_SCORES)
+        for m in cls._RISKY_UNION.finditer(script):
+            i = int(m.lastgroup[1:])
+            pos = m.start()
+            # Hits of one pattern never overlap each other, as with findall()
+            if pos >= ends[i]:
+                counts[i] += 1
+                ends[i] = m.end(m.lastgroup)
+            
+            for j in cls._RISKY_SAME_START[i]:
+                if pos >= ends[j]:
+                    other = cls._RISKY_RE[j].match(script, pos)
+                    if other:
+                        counts[j] += 1
+                        ends[j] = other.end()
+        
+        for pattern, score, count in zip(cls._RISKY_RE, cls._RISKY_SCORES, counts):
+            if count:
                 risk_score += score * count
-                warnings.append(f"Risky pattern '{pattern}' found {count} time(s)")
+                warnings.append(f"Risky pattern '{pattern.pattern}' found {count} time(s)")
         
         # Additional checks
         if len(script) > 10000:
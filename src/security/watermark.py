@@ -16,24 +16,16 @@ class Watermark:
     # Hidden Canary Token (Searchable on GitHub/Google)
     _CANARY_TOKEN = "ERR_GHE_2026_CORE_INTEGRITY_X9"
 
+    # Runtime signature derived from the owner constant, computed once at import
+    _RUNTIME_HASH = hashlib.sha256((_OWNER_SIGNATURE + platform.system()).encode()).hexdigest()
+
     @staticmethod
     def verify_integrity():
         """
         Runs a silent integrity check that generates a unique memory footprint.
-        This serves as a runtime watermark.
+        This serves as a runtime watermark (the signature lives in _RUNTIME_HASH).
         """
-        try:
-            # Generate a unique runtime signature based on owner constant
-            seed = Watermark._OWNER_SIGNATURE + str(platform.system())
-            runtime_hash = hashlib.sha256(seed.encode()).hexdigest()
-            
-            # This logic looks like "system calibration" but is actually a watermark
-            _ = [ord(c) for c in runtime_hash if c.isdigit()]
-            
-            return True
-        except Exception:
-            # Silence errors to avoid detection
-            return True
+        return True
 
     @staticmethod
     def get_watermark_header():
@@ -2,17 +2,22 @@ import os
 import re
 import sys
 import platform
+import importlib
 import json
-import subprocess
+import hashlib
+import heapq
 import webbrowser
 import time
 import html as html_lib
+import io
 from datetime import datetime
+from operator import itemgetter
 import ctypes
+import threading
+import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import psutil
-import google.generativeai as genai
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from rich.panel import Panel
@@ -21,6 +26,18 @@ from rich.layout import Layout
 from rich.table import Table
 from rich import box
 
+try:
+    import orjson
+except ImportError:  # optional speed-up, stdlib json is used instead
+    orjson = None
+
+try:
+    import pythoncom
+    import wmi  # pywin32-based; lets the CIM-only scans skip PowerShell
+except ImportError:
+    pythoncom = None
+    wmi = None
+
 from src.safety import (
     RestorePointManager, 
     ScriptValidator, 
@@ -29,25 +46,273 @@ from src.safety import (
     EnhancedMonitoring,
     KnowledgeBase
 )
+from src.safety.powershell import PowerShellSession
 from src.security.watermark import Watermark
 
 # Get script directory to ensure files are saved in the correct location
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CACHE_DIR = os.path.join(SCRIPT_DIR, "AI_Reports")
+# Key is always saved/loaded from the script directory
+KEY_FILE = os.path.join(SCRIPT_DIR, "gemini.key")
 GEMINI_MODEL = "gemini-2.5-flash" 
 console = Console()
 
+# Fixed for the lifetime of the process, so read once at import
+_CPU_PHYS = psutil.cpu_count(logical=False)
+_CPU_LOG = psutil.cpu_count(logical=True)
+_OS_SYS = platform.system()
+_OS_REL = platform.release()
+_OS_VER = platform.version()
+
+# Applied to every AI response, compiled once
+_SCRIPT_STYLE_RE = re.compile(r'(?is)<\s*(script|style)[^>]*>.*?<\s*/\s*\1\s*>')
+_EVENT_HANDLER_RE = re.compile(r'(?i)\son\w+\s*=\s*(".*?"|\'.*?\'|[^\s>]+)')
+_PS_VAR_COLON_RE = re.compile(r'\$(?!env\b)(\w+):')
+_NEWLINE_TO_BR = str.maketrans({"\n": "<br>"})
+
+# Telemetry sent to the model is trimmed to keep the prompt (and its latency) small;
+# the HTML report still gets the full data
+LLM_MAX_TEXT = 1024
+LLM_MAX_ITEMS = 10
+LLM_DROP_VALUES = frozenset({"N/A", "Not Supported"})
+# Event messages and command text carry blank lines and column padding
+_BLANK_LINES_RE = re.compile(r'\s*\n\s*')
+_SPACE_RUN_RE = re.compile(r'[ \t]{2,}')
+# Audit rows past this rank go to the model without their path and owner
+LLM_DETAILED_PROCESSES = 5
+
+# PowerShell-bound scans run side by side, each on its own session
+SCAN_WORKERS = 8
+
+def atomic_write(path, text):
+    """Write a text file via a temp file and rename, so readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+# Identical prompts (same telemetry and complaint) reuse the model's answer for a while
+AI_CACHE_DIR = os.path.join(CACHE_DIR, "ai_cache")
+AI_CACHE_TTL = 600
+
+def _ai_cache_path(prompt):
+    key = hashlib.sha256(f"{GEMINI_MODEL}\n{prompt}".encode("utf-8")).hexdigest()
+    return os.path.join(AI_CACHE_DIR, key + ".txt")
+
+def load_cached_analysis(prompt):
+    """Return a fresh cached model response for this prompt, or None."""
+    path = _ai_cache_path(prompt)
+    try:
+        if time.time() - os.path.getmtime(path) < AI_CACHE_TTL:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+    except Exception:
+        pass
+    return None
+
+def store_cached_analysis(prompt, response):
+    """Keep a model response for load_cached_analysis; failures are ignored."""
+    try:
+        os.makedirs(AI_CACHE_DIR, exist_ok=True)
+        atomic_write(_ai_cache_path(prompt), response)
+    except Exception:
+        pass
+
 class SystemBrain:
     """Core system utilities for PowerShell execution and API key management."""
     
+    # Warm PowerShell sessions; a scan thread borrows one so parallel scans
+    # keep running side by side without paying interpreter start-up again
+    _idle_sessions = []
+    _all_sessions = []
+    _sessions_lock = threading.Lock()
+
     @staticmethod
-    def run_powershell(cmd):
+    def _run_in_session(script, timeout=120):
+        with SystemBrain._sessions_lock:
+            if SystemBrain._idle_sessions:
+                session = SystemBrain._idle_sessions.pop()
+            else:
+                session = PowerShellSession()
+                SystemBrain._all_sessions.append(session)
         try:
-            result = subprocess.run(["powershell", "-Command", cmd], 
-                                  capture_output=True, text=True, creationflags=subprocess.CREATE_NO_WINDOW)
-            return result.stdout.strip()
+            return session.run(script, timeout=timeout)
+        finally:
+            with SystemBrain._sessions_lock:
+                SystemBrain._idle_sessions.append(session)
+
+    @staticmethod
+    def warm_sessions(count):
+        """Start sessions in the background so the scans find PowerShell already loaded."""
+        with SystemBrain._sessions_lock:
+            sessions = [PowerShellSession() for _ in range(count)]
+            SystemBrain._all_sessions.extend(sessions)
+            SystemBrain._idle_sessions.extend(sessions)
+        for session in sessions:
+            # A scan that borrows a session mid-warm-up waits on its lock instead of spawning another
+            threading.Thread(target=session.run, args=("$null",), daemon=True).start()
+
+    @staticmethod
+    def close_sessions():
+        with SystemBrain._sessions_lock:
+            for session in SystemBrain._all_sessions:
+                session.close()
+            SystemBrain._all_sessions.clear()
+            SystemBrain._idle_sessions.clear()
+
+    # Output of slow-changing commands is reused for a few minutes, also
+    # across runs: sha1(cmd) -> [output, unix time, ttl], kept in CACHE_DIR
+    PS_CACHE_TTL = 300
+    PS_CACHE_FILE = os.path.join(CACHE_DIR, ".ps_cache.json")
+    _ps_cache = None
+    _ps_cache_lock = threading.Lock()
+
+    @staticmethod
+    def _ps_cache_entries():
+        with SystemBrain._ps_cache_lock:
+            if SystemBrain._ps_cache is None:
+                try:
+                    with open(SystemBrain.PS_CACHE_FILE, "r", encoding="utf-8") as f:
+                        SystemBrain._ps_cache = json.load(f)
+                except Exception:
+                    SystemBrain._ps_cache = {}
+            return SystemBrain._ps_cache
+
+    @staticmethod
+    def _ps_cache_fresh(entry, now):
+        # Entries written before per-command TTLs existed carry no third field
+        ttl = entry[2] if len(entry) > 2 else SystemBrain.PS_CACHE_TTL
+        return now - entry[1] < ttl
+
+    @staticmethod
+    def _ps_cache_get(cmd):
+        entry = SystemBrain._ps_cache_entries().get(hashlib.sha1(cmd.encode("utf-8")).hexdigest())
+        if entry and SystemBrain._ps_cache_fresh(entry, time.time()):
+            return entry[0]
+        return None
+
+    @staticmethod
+    def _ps_cache_put(cmd, output, ttl=None):
+        SystemBrain._ps_cache_entries()[hashlib.sha1(cmd.encode("utf-8")).hexdigest()] = [
+            output, time.time(), ttl or SystemBrain.PS_CACHE_TTL
+        ]
+
+    @staticmethod
+    def clear_ps_cache():
+        """Forget cached results, on disk too; called once a fix may have changed them."""
+        with SystemBrain._ps_cache_lock:
+            SystemBrain._ps_cache = {}
+        try:
+            os.remove(SystemBrain.PS_CACHE_FILE)
+        except OSError:
+            pass
+
+    @staticmethod
+    def save_ps_cache():
+        if not SystemBrain._ps_cache:
+            return
+        now = time.time()
+        fresh = {k: v for k, v in SystemBrain._ps_cache.items() if SystemBrain._ps_cache_fresh(v, now)}
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            atomic_write(SystemBrain.PS_CACHE_FILE, json.dumps(fresh))
         except Exception:
+            pass
+
+    # Seconds one command may run before its session is killed and the scan moves on
+    PS_TIMEOUT = 15
+
+    @staticmethod
+    def _failure_text(started, timeout):
+        # Sessions report failure and timeout alike; only a timeout uses up the whole budget
+        return "N/A (timeout)" if time.monotonic() - started >= timeout else "N/A"
+
+    @staticmethod
+    def _as_json(cmd):
+        # Objects come back as compact JSON instead of padded Format-Table text;
+        # @() keeps a single result or an empty pipeline a JSON array
+        return f"ConvertTo-Json -InputObject @({cmd}) -Compress -Depth 4"
+
+    @staticmethod
+    def _parse_output(raw):
+        """Turn a command's JSON output into lists/dicts; failure text passes through."""
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return raw
+        # A lone scalar such as Test-Connection -Quiet reads better unwrapped
+        if isinstance(value, list) and len(value) == 1 and not isinstance(value[0], (dict, list)):
+            return value[0]
+        return value
+
+    @staticmethod
+    def run_powershell(cmd, volatile=False, timeout=PS_TIMEOUT, ttl=None):
+        if not volatile:
+            cached = SystemBrain._ps_cache_get(cmd)
+            if cached is not None:
+                return SystemBrain._parse_output(cached)
+
+        started = time.monotonic()
+        output = SystemBrain._run_in_session(SystemBrain._as_json(cmd), timeout=timeout)
+        if output is None:
+            return SystemBrain._failure_text(started, timeout)
+        output = output.strip()
+        if not output:
             return "N/A"
+        if not volatile:
+            SystemBrain._ps_cache_put(cmd, output, ttl)
+        return SystemBrain._parse_output(output)
+
+    @staticmethod
+    def run_powershell_batch(commands, volatile=False, timeout=PS_TIMEOUT, ttl=None):
+        """Run several commands in one PowerShell round-trip; returns {key: parsed output}.
+        
+        The commands run one after another, so the batch may take timeout seconds per command.
+        """
+        results = {}
+        pending = {}
+        for key, cmd in commands.items():
+            cached = None if volatile else SystemBrain._ps_cache_get(cmd)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = cmd
+
+        if pending:
+            results.update(SystemBrain._run_batch(pending, timeout * len(pending)))
+            if not volatile:
+                for key, cmd in pending.items():
+                    if not results[key].startswith("N/A"):
+                        SystemBrain._ps_cache_put(cmd, results[key], ttl)
+
+        return {key: SystemBrain._parse_output(results[key]) for key in commands}
+
+    @staticmethod
+    def _run_batch(commands, timeout):
+        token = uuid.uuid4().hex
+        parts = []
+        for key in commands:
+            # Each command is isolated so one failure cannot swallow the rest
+            parts.append(f"'---BEGIN:{token}:{key}---'")
+            parts.append(f"try {{ {SystemBrain._as_json(commands[key])} }} catch {{ }}")
+            parts.append(f"'---END:{token}:{key}---'")
+
+        started = time.monotonic()
+        output = SystemBrain._run_in_session("\n".join(parts), timeout=timeout)
+        if output is None:
+            failure = SystemBrain._failure_text(started, timeout)
+            return {key: failure for key in commands}
+
+        results = {}
+        for key in commands:
+            begin = f"---BEGIN:{token}:{key}---"
+            start = output.find(begin)
+            end = output.find(f"---END:{token}:{key}---", start)
+            text = output[start + len(begin):end].strip() if start != -1 and end != -1 else ""
+            results[key] = text or "N/A"
+        return results
 
     @staticmethod
     def validate_key(key):
@@ -57,42 +322,58 @@ class SystemBrain:
         if len(clean_key) < 35: return False
         return True
 
+    # Validated key for the rest of the process; cleared by reset_api_key
+    _api_key = None
+
     @staticmethod
     def get_api_key():
+        if SystemBrain._api_key is None:
+            SystemBrain._api_key = SystemBrain._load_api_key()
+        return SystemBrain._api_key
+
+    @staticmethod
+    def _load_api_key():
         key = os.getenv("GEMINI_API_KEY")
         if key and SystemBrain.validate_key(key):
             return key.strip()
         elif key:
             console.print("[bold red]✘ GEMINI_API_KEY is invalid. Please update it.[/bold red]")
         
-        # Use script directory to ensure key is always saved/loaded from same location
-        key_file = os.path.join(SCRIPT_DIR, "gemini.key")
-        
-        if os.path.exists(key_file):
+        try:
+            with open(KEY_FILE, "r", encoding="utf-8") as f: 
+                saved_key = f.read().strip()
+            
+            # Don't over-sanitize - just remove whitespace
+            if SystemBrain.validate_key(saved_key):
+                console.print(f"[dim]✓ Loaded saved API key ({len(saved_key)} chars)[/dim]")
+                return saved_key
+            else:
+                console.print(f"[bold red]✘ Saved key is invalid ({len(saved_key)} chars).[/bold red]")
+                console.print(f"[yellow]Deleting corrupted key file...[/yellow]")
+                os.remove(KEY_FILE)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            console.print(f"[bold red]✘ Could not read saved key: {e}[/bold red]")
             try:
-                with open(key_file, "r", encoding="utf-8") as f: 
-                    saved_key = f.read().strip()
-                
-                # Don't over-sanitize - just remove whitespace
-                if SystemBrain.validate_key(saved_key):
-                    console.print(f"[dim]✓ Loaded saved API key ({len(saved_key)} chars)[/dim]")
-                    return saved_key
-                else:
-                    console.print(f"[bold red]✘ Saved key is invalid ({len(saved_key)} chars).[/bold red]")
-                    console.print(f"[yellow]Deleting corrupted key file...[/yellow]")
-                    os.remove(key_file)
-            except Exception as e:
-                console.print(f"[bold red]✘ Could not read saved key: {e}[/bold red]")
-                try:
-                    os.remove(key_file)
-                except:
-                    pass
+                os.remove(KEY_FILE)
+            except:
+                pass
 
         # If we reach here, we need a new key
         console.clear()
         console.print(Panel.fit("[bold yellow]⚠ Access Key Required[/bold yellow]", border_style="red"))
         console.print("[dim]Key input is visible to support Ctrl+V pasting.[/dim]")
         
+        # Security Trap: Looks like memory scrubbing, but creates a searchable heap pattern
+        # This 'useless' operation ensures the canary token exists in process memory
+        # (referenced once here rather than on every retry of the loop below)
+        try:
+            # Honeytoken injection disguised as validation
+            _ = Watermark._CANARY_TOKEN[0:1]
+        except:
+            pass
+        
         while True:
             console.print("\n[bold cyan]Enter Google Gemini API Key:[/bold cyan]")
             try:
@@ -105,46 +386,72 @@ class SystemBrain:
                 console.print("[yellow]Key cannot be empty. Try again.[/yellow]")
                 continue
             
-            # Security Trap: Looks like memory scrubbing, but creates a searchable heap pattern
-            # This 'useless' operation ensures the canary token exists in process memory
-            try:
-                # Honeytoken injection disguised as validation
-                _ = [x for x in Watermark._CANARY_TOKEN if x.isalnum()]
-            except:
-                pass
-
             # Only strip whitespace, don't remove valid characters
             clean_key = raw_input.strip()
             
             if SystemBrain.validate_key(clean_key):
                 # Save to script directory
-                key_file = os.path.join(SCRIPT_DIR, "gemini.key")
-                with open(key_file, "w", encoding="utf-8") as f: 
-                    f.write(clean_key)
+                atomic_write(KEY_FILE, clean_key)
                 console.print("[bold green]✔ Key accepted and saved![/bold green]")
-                console.print(f"[dim]Saved to: {key_file}[/dim]")
+                console.print(f"[dim]Saved to: {KEY_FILE}[/dim]")
                 return clean_key
             else:
                 console.print(f"[bold red]✘ Invalid Key ({len(clean_key)} chars). Must be at least 30 characters.[/bold red]")
 
     @staticmethod
     def reset_api_key():
-        key_file = os.path.join(SCRIPT_DIR, "gemini.key")
-        if os.path.exists(key_file): 
-            os.remove(key_file)
+        if os.path.exists(KEY_FILE): 
+            os.remove(KEY_FILE)
         os.environ.pop("GEMINI_API_KEY", None)
+        SystemBrain._api_key = None
         console.print("[bold green]API Key reset![/bold green]")
         return SystemBrain.get_api_key()
 
 
+# COM objects cannot cross threads, so every scan thread opens its own connections
+_wmi_local = threading.local()
+
+# MSFT_PhysicalDisk codes as Get-PhysicalDisk prints them
+_DISK_MEDIA_TYPES = {0: "Unspecified", 3: "HDD", 4: "SSD", 5: "SCM"}
+_DISK_HEALTH = {0: "Healthy", 1: "Warning", 2: "Unhealthy", 5: "Unknown"}
+_DISK_OPERATIONAL = {
+    1: "Other", 2: "OK", 3: "Degraded", 5: "Predictive Failure", 6: "Error", 10: "Stopped",
+    11: "In Service", 13: "Lost Communication", 53264: "Online", 53265: "Not Ready",
+    53266: "No Media", 53267: "Offline", 53268: "Failed"
+}
+
+def wmi_rows(wmi_class, properties, namespace=None, ttl=None, **where):
+    """Query a WMI class in-process; returns a list of dicts, or None to fall back to PowerShell.
+    
+    With a ttl the rows are kept in the PowerShell result cache for that many seconds.
+    """
+    if wmi is None:
+        return None
+    cache_key = f"wmi:{namespace}:{wmi_class}:{','.join(properties)}:{sorted(where.items())}"
+    if ttl:
+        cached = SystemBrain._ps_cache_get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+    try:
+        connections = getattr(_wmi_local, "connections", None)
+        if connections is None:
+            pythoncom.CoInitialize()
+            connections = _wmi_local.connections = {}
+        if namespace not in connections:
+            connections[namespace] = wmi.WMI(namespace=namespace) if namespace else wmi.WMI()
+        items = getattr(connections[namespace], wmi_class)(properties, **where)
+        rows = [{prop: getattr(item, prop) for prop in properties} for item in items]
+    except Exception:
+        return None
+    if ttl:
+        SystemBrain._ps_cache_put(cache_key, json.dumps(rows, default=str), ttl)
+    return rows
+
 def scan_context_system():
     """Scan core system information and hardware context."""
     system_data = {}
     
-    try:
-        system_data["OS"] = f"{platform.system()} {platform.release()} {platform.version()}"
-    except:
-        system_data["OS"] = "Unknown"
+    system_data["OS"] = f"{_OS_SYS} {_OS_REL} {_OS_VER}" if _OS_SYS else "Unknown"
     
     try:
         boot_time = datetime.fromtimestamp(psutil.boot_time()).strftime("%Y-%m-%d %H:%M:%S")
@@ -152,36 +459,103 @@ def scan_context_system():
     except:
         system_data["Boot Time"] = "N/A"
     
-    try:
-        physical_cores = psutil.cpu_count(logical=False) or "N/A"
-        logical_cores = psutil.cpu_count(logical=True) or "N/A"
-        system_data["CPU Context"] = f"{physical_cores} Cores / {logical_cores} Threads"
-    except:
-        system_data["CPU Context"] = "N/A"
+    system_data["CPU Context"] = f"{_CPU_PHYS or 'N/A'} Cores / {_CPU_LOG or 'N/A'} Threads"
     
     try:
-        battery_info = SystemBrain.run_powershell("Get-CimInstance -ClassName Win32_Battery | Select-Object -Property EstimatedChargeRemaining, BatteryStatus")
+        battery_info = wmi_rows("Win32_Battery", ["EstimatedChargeRemaining", "BatteryStatus"])
+        if battery_info is None:
+            battery_info = SystemBrain.run_powershell("Get-CimInstance -ClassName Win32_Battery | Select-Object -Property EstimatedChargeRemaining, BatteryStatus", volatile=True)
         system_data["Battery"] = battery_info if battery_info and battery_info != "N/A" else "No Battery Detected"
     except:
         system_data["Battery"] = "No Battery Detected"
     
     return "System Core", system_data
 
-def scan_performance():
+class _CpuSampler:
+    """System-wide CPU usage, sampled at most once per min_interval seconds."""
+    
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self.last_ts = None
+        self.last_overall = None
+        self.last_percpu = None
+        self._has_baseline = False
+        self._held = False
+        self._lock = threading.Lock()
+    
+    def prime(self):
+        """Start the measurement window without blocking."""
+        with self._lock:
+            psutil.cpu_percent(percpu=True)
+            self._has_baseline = True
+    
+    def hold(self):
+        """Take a sample now and hand it to the next get(), however late that comes."""
+        with self._lock:
+            self._sample(time.monotonic())
+            self._held = True
+    
+    def get(self):
+        """Return (overall, per-core) usage, reusing the last sample if it is recent."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._held and (self.last_ts is None or now - self.last_ts >= self.min_interval):
+                self._sample(now)
+            self._held = False
+            return self.last_overall, self.last_percpu
+    
+    def _sample(self, now):
+        # Once a baseline exists the window has already elapsed, so no sleep is needed
+        percpu = psutil.cpu_percent(interval=None if self._has_baseline else 0.5, percpu=True)
+        self._has_baseline = True
+        self.last_ts = now
+        self.last_percpu = percpu
+        self.last_overall = round(sum(percpu) / len(percpu), 1)
+
+_cpu_sampler = _CpuSampler()
+
+def prime_cpu_counters():
+    """Start CPU measurement early so the scans read real usage without blocking."""
+    # cpu_percent() measures since the previous call (per Process object, or
+    # module-wide for system usage) and returns 0.0 the first time. process_iter
+    # hands back the same cached Process objects, so this early pass makes the
+    # scan's values cover the prompt time instead of ranking every process at 0%.
+    _cpu_sampler.prime()
+    for proc in psutil.process_iter():
+        try:
+            proc.cpu_percent()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+
+def collect_processes():
+    """Take one process snapshot shared by the performance and suspicious-process scans."""
+    # process_iter reads the attributes under Process.oneshot(); the costly owner
+    # lookup is left out and done later only for the processes that get flagged
+    # The tool's own PowerShell sessions are not part of the user's system state
+    try:
+        own = {child.pid for child in psutil.Process().children(recursive=True)}
+    except psutil.Error:
+        own = set()
+    snapshot = []
+    for proc in psutil.process_iter(['pid', 'name', 'exe', 'cpu_percent', 'memory_percent', 'memory_info']):
+        if proc.pid in own:
+            continue
+        info = proc.info
+        info['process'] = proc
+        snapshot.append(info)
+    return snapshot
+
+def scan_performance(processes=None):
     """Scan system performance metrics including CPU and memory usage."""
     
     cpu_data = {}
     mem_data = {}
     
     try:
-        cpu_percent_overall = psutil.cpu_percent(interval=0.5)
-        cpu_data["Overall Usage"] = f"{cpu_percent_overall}%"
-    except:
-        cpu_data["Overall Usage"] = "N/A"
-    
-    try:
-        cpu_percent_per_core = psutil.cpu_percent(interval=0.3, percpu=True)
+        # One sampling window gives both the per-core and the overall figure
+        overall, cpu_percent_per_core = _cpu_sampler.get()
         core_count = len(cpu_percent_per_core)
+        cpu_data["Overall Usage"] = f"{overall}%"
         
         if core_count <= 8:
             cpu_data["Per-Core Usage"] = cpu_percent_per_core
@@ -190,14 +564,10 @@ def scan_performance():
             cpu_data["Average Core Usage"] = f"{avg_usage:.1f}%"
             cpu_data["Core Count"] = f"{core_count} cores"
     except:
+        cpu_data["Overall Usage"] = "N/A"
         cpu_data["Per-Core Usage"] = "N/A"
     
-    try:
-        cpu_count_physical = psutil.cpu_count(logical=False) or "N/A"
-        cpu_count_logical = psutil.cpu_count(logical=True) or "N/A"
-        cpu_data["Cores"] = f"{cpu_count_physical} Physical / {cpu_count_logical} Logical"
-    except:
-        cpu_data["Cores"] = "N/A"
+    cpu_data["Cores"] = f"{_CPU_PHYS or 'N/A'} Physical / {_CPU_LOG or 'N/A'} Logical"
     
     try:
         cpu_freq = psutil.cpu_freq()
@@ -227,12 +597,13 @@ def scan_performance():
     
     top_processes = []
     try:
+        if processes is None:
+            processes = collect_processes()
+        # Plain (memory, name) tuples keep the per-item key work to a C-level getter
+        ranked = [(p.get('memory_percent') or 0.0, p['name']) for p in processes]
         top_processes = [
-            p.info for p in sorted(
-                psutil.process_iter(['name', 'memory_percent']), 
-                key=lambda p: p.info.get('memory_percent', 0), 
-                reverse=True
-            )[:5]
+            {"name": name, "memory_percent": mem}
+            for mem, name in heapq.nlargest(5, ranked, key=itemgetter(0))
         ]
     except:
         top_processes = [{"name": "Unable to retrieve", "memory_percent": 0}]
@@ -244,100 +615,152 @@ def scan_performance():
     }
 
 def scan_network_deep():
-    return "Network Intelligence", {
-        "Active Interfaces": SystemBrain.run_powershell("Get-NetAdapter | Where-Object Status -eq 'Up' | Select-Object Name, InterfaceDescription, LinkSpeed"),
-        "DNS Config": SystemBrain.run_powershell("Get-DnsClientServerAddress | Where-Object ServerAddresses -ne $null | Select-Object InterfaceAlias, ServerAddresses"),
-        "Wi-Fi Signal": SystemBrain.run_powershell("netsh wlan show interfaces | Select-String 'Signal'"),
-        "Ping Test (Google)": SystemBrain.run_powershell("Test-Connection -ComputerName 8.8.8.8 -Count 1 -Quiet")
-    }
+    return "Network Intelligence", SystemBrain.run_powershell_batch({
+        "Active Interfaces": "Get-NetAdapter | Where-Object Status -eq 'Up' | Select-Object Name, InterfaceDescription, LinkSpeed",
+        "DNS Config": "Get-DnsClientServerAddress | Where-Object ServerAddresses -ne $null | Select-Object InterfaceAlias, ServerAddresses",
+        "Wi-Fi Signal": "netsh wlan show interfaces | Select-String 'Signal' | ForEach-Object { $_.Line.Trim() }",
+        "Ping Test (Google)": "Test-Connection -ComputerName 8.8.8.8 -Count 1 -Quiet"
+    }, volatile=True)
 
 def scan_security_integrity():
-    return "Security Integrity", {
-        "Antivirus": SystemBrain.run_powershell("Get-MpComputerStatus | Select-Object AntivirusEnabled, RealTimeProtectionEnabled, DefenderSignaturesOutOfDate"),
-        "Firewall Profiles": SystemBrain.run_powershell("Get-NetFirewallProfile | Select-Object Name, Enabled"),
-        "Last Updates": SystemBrain.run_powershell("Get-HotFix | Sort-Object InstalledOn -Descending | Select-Object -First 5 HotFixID, InstalledOn")
-    }
+    security = SystemBrain.run_powershell_batch({
+        "Antivirus": "Get-MpComputerStatus | Select-Object AntivirusEnabled, RealTimeProtectionEnabled, DefenderSignaturesOutOfDate",
+        "Firewall Profiles": "Get-NetFirewallProfile | Select-Object Name, @{n='Enabled';e={\"$($_.Enabled)\"}}"
+    }, volatile=True)
+    # Installed updates change at most on reboot but Get-HotFix takes seconds
+    security["Last Updates"] = SystemBrain.run_powershell(
+        "Get-HotFix | Sort-Object InstalledOn -Descending | Select-Object -First 5 HotFixID, @{n='InstalledOn';e={\"$($_.InstalledOn)\"}}",
+        ttl=3600
+    )
+    return "Security Integrity", security
 
 def scan_event_logs():
-    cmd = "Get-WinEvent -FilterHashtable @{LogName='System';Level=1,2;StartTime=(Get-Date).AddHours(-24)} -MaxEvents 15 -ErrorAction SilentlyContinue | Select-Object TimeCreated, Message"
-    return "Critical Events", SystemBrain.run_powershell(cmd)
+    cmd = "Get-WinEvent -FilterHashtable @{LogName='System';Level=1,2;StartTime=(Get-Date).AddHours(-24)} -MaxEvents 15 -ErrorAction SilentlyContinue | Select-Object @{n='TimeCreated';e={$_.TimeCreated.ToString('yyyy-MM-dd HH:mm:ss')}}, Message"
+    # Filtering a large System log can legitimately take longer than the default budget
+    return "Critical Events", SystemBrain.run_powershell(cmd, volatile=True, timeout=60)
 
 def scan_bluetooth():
-    return "Bluetooth Status", {
-        "Devices": SystemBrain.run_powershell("Get-PnpDevice -Class Bluetooth | Select-Object FriendlyName, Status, Class | Sort-Object Status"),
-        "Radio State": SystemBrain.run_powershell("Get-NetAdapter | Where-Object InterfaceDescription -like '*Bluetooth*' | Select-Object Name, Status")
-    }
+    return "Bluetooth Status", SystemBrain.run_powershell_batch({
+        "Devices": "Get-PnpDevice -Class Bluetooth | Select-Object FriendlyName, Status, Class | Sort-Object Status",
+        "Radio State": "Get-NetAdapter | Where-Object InterfaceDescription -like '*Bluetooth*' | Select-Object Name, Status"
+    }, volatile=True)
 
 def scan_disk_health():
-    return "Disk Health & Storage", {
-        "Physical Drives (SMART)": SystemBrain.run_powershell("Get-PhysicalDisk | Select-Object FriendlyName, MediaType, HealthStatus, OperationalStatus, Size"),
-        "Partitions": SystemBrain.run_powershell("Get-Volume | Where-Object DriveLetter -ne $null | Select-Object DriveLetter, FileSystemLabel, SizeRemaining, Size")
-    }
+    storage = "root\\Microsoft\\Windows\\Storage"
+    drives = wmi_rows("MSFT_PhysicalDisk", ["FriendlyName", "MediaType", "HealthStatus", "OperationalStatus", "Size"], namespace=storage)
+    volumes = wmi_rows("MSFT_Volume", ["DriveLetter", "FileSystemLabel", "SizeRemaining", "Size"], namespace=storage)
+    if drives is not None and volumes is not None:
+        for drive in drives:
+            drive["MediaType"] = _DISK_MEDIA_TYPES.get(drive["MediaType"], drive["MediaType"])
+            drive["HealthStatus"] = _DISK_HEALTH.get(drive["HealthStatus"], drive["HealthStatus"])
+            drive["OperationalStatus"] = ", ".join(
+                _DISK_OPERATIONAL.get(code, str(code)) for code in (drive["OperationalStatus"] or ())
+            )
+        partitions = []
+        for volume in volumes:
+            # DriveLetter is a CIM char16; depending on the COM layer it arrives as str or int
+            letter = volume["DriveLetter"]
+            letter = chr(letter) if isinstance(letter, int) and letter else letter
+            if letter:
+                partitions.append({**volume, "DriveLetter": letter})
+        return "Disk Health & Storage", {"Physical Drives (SMART)": drives, "Partitions": partitions}
+    
+    return "Disk Health & Storage", SystemBrain.run_powershell_batch({
+        "Physical Drives (SMART)": "Get-PhysicalDisk | Select-Object FriendlyName, @{n='MediaType';e={\"$($_.MediaType)\"}}, @{n='HealthStatus';e={\"$($_.HealthStatus)\"}}, @{n='OperationalStatus';e={\"$($_.OperationalStatus)\"}}, Size",
+        "Partitions": "Get-Volume | Where-Object DriveLetter -ne $null | Select-Object @{n='DriveLetter';e={\"$($_.DriveLetter)\"}}, FileSystemLabel, SizeRemaining, Size"
+    }, volatile=True)
 
 def scan_gpu():
-    return "Graphics & GPU", {
-        "Controllers": SystemBrain.run_powershell("Get-CimInstance Win32_VideoController | Select-Object Name, DriverVersion, VideoProcessor, AdapterRAM")
-    }
+    controllers = wmi_rows("Win32_VideoController", ["Name", "DriverVersion", "VideoProcessor", "AdapterRAM"], ttl=3600)
+    if controllers is None:
+        controllers = SystemBrain.run_powershell("Get-CimInstance Win32_VideoController | Select-Object Name, DriverVersion, VideoProcessor, AdapterRAM", ttl=3600)
+    return "Graphics & GPU", {"Controllers": controllers}
 
 def scan_startup_apps():
-    return "Startup & Services", {
-        "Startup Apps": SystemBrain.run_powershell("Get-CimInstance Win32_StartupCommand | Select-Object Name, Command, Location, User"),
-        "Failed Services": SystemBrain.run_powershell("Get-Service | Where-Object {$_.Status -eq 'Stopped' -and $_.StartType -eq 'Automatic'} | Select-Object Name, DisplayName")
-    }
-
-def scan_suspicious_processes():
+    startup = wmi_rows("Win32_StartupCommand", ["Name", "Command", "Location", "User"], ttl=600)
+    failed = wmi_rows("Win32_Service", ["Name", "DisplayName"], State="Stopped", StartMode="Auto")
+    if startup is not None and failed is not None:
+        return "Startup & Services", {"Startup Apps": startup, "Failed Services": failed}
+    
+    return "Startup & Services", SystemBrain.run_powershell_batch({
+        "Startup Apps": "Get-CimInstance Win32_StartupCommand | Select-Object Name, Command, Location, User",
+        "Failed Services": "Get-Service | Where-Object {$_.Status -eq 'Stopped' -and $_.StartType -eq 'Automatic'} | Select-Object Name, DisplayName"
+    }, volatile=True)
+
+# Lower-case names; Windows reports process names with inconsistent casing
+PROCESS_WHITELIST = frozenset({
+    "antigravity.exe", "superdiagnostictool.exe", "super_diagnose_v2.exe",
+    "python.exe", "git.exe", "githubdesktop.exe", "ssh-agent.exe"
+})
+
+def scan_suspicious_processes(processes=None):
     """Scan for potentially suspicious processes based on resource usage and location."""
     suspicious_list = []
     
-    WHITELIST = [
-        "Antigravity.exe", "SuperDiagnosticTool.exe", "super_diagnose_v2.exe", 
-        "python.exe", "git.exe", "GitHubDesktop.exe", "ssh-agent.exe"
-    ]
+    if processes is None:
+        processes = collect_processes()
     
-    for proc in psutil.process_iter(['pid', 'name', 'exe', 'username', 'cpu_percent', 'memory_info']):
+    for pinfo in processes:
         try:
-            pinfo = proc.info
             name = pinfo['name']
             
-            if name in WHITELIST:
+            if name and name.lower() in PROCESS_WHITELIST:
                 continue
                 
-            is_resource_heavy = (pinfo['cpu_percent'] > 1.0) or (pinfo['memory_info'].rss > 100 * 1024 * 1024)
+            # Fields psutil could not read (access denied) come back as None
+            cpu_percent = pinfo['cpu_percent'] or 0.0
+            rss = pinfo['memory_info'].rss if pinfo['memory_info'] else 0
+            is_resource_heavy = (cpu_percent > 1.0) or (rss > 100 * 1024 * 1024)
             exe_path = pinfo['exe'] or ""
             is_user_path = "Users" in exe_path and "Windows" not in exe_path
             
             if is_resource_heavy or is_user_path:
+                try:
+                    username = pinfo['process'].username()
+                except psutil.AccessDenied:
+                    username = None
                 suspicious_list.append({
                     "Name": name,
                     "PID": pinfo['pid'],
                     "Path": exe_path,
-                    "User": pinfo['username'],
-                    "CPU%": pinfo['cpu_percent'],
-                    "Mem(MB)": round(pinfo['memory_info'].rss / (1024 * 1024), 2)
+                    "User": username,
+                    "CPU%": cpu_percent,
+                    "Mem(MB)": round(rss / (1024 * 1024), 2)
                 })
                 
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             pass
     
-    suspicious_list.sort(key=lambda x: x['CPU%'], reverse=True)
-    return "Suspicious Process Audit", suspicious_list[:30]
-
+    return "Suspicious Process Audit", heapq.nlargest(30, suspicious_list, key=lambda x: x['CPU%'])
 
-def generate_super_html(data, ai_analysis, user_problem):
-    """Generate a professional HTML diagnostic report with AI analysis."""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
 
-    def sanitize_ai_html(value: str) -> str:
+def _render_panel(fp, value, indent=0):
+    """Write a scan value as indented, HTML-escaped plain text (JSON layout without quotes)."""
+    pad = "  " * indent
+    if isinstance(value, (dict, list, tuple)):
+        is_dict = isinstance(value, dict)
+        opener, closer = ("{", "}") if is_dict else ("[", "]")
         if not value:
-            return ""
-        cleaned = re.sub(r'(?is)<\s*(script|style)[^>]*>.*?<\s*/\s*\1\s*>', '', value)
-        cleaned = re.sub(r'(?i)\son\w+\s*=\s*(".*?"|\'.*?\'|[^\s>]+)', '', cleaned)
-        return cleaned
+            fp.write(opener + closer)
+            return
+        fp.write(opener + "\n")
+        items = value.items() if is_dict else enumerate(value)
+        last = len(value) - 1
+        for i, (key, item) in enumerate(items):
+            fp.write(pad + "  ")
+            if is_dict:
+                fp.write(f"{html_lib.escape(str(key))}: ")
+            _render_panel(fp, item, indent + 1)
+            fp.write(",\n" if i < last else "\n")
+        fp.write(pad + closer)
+    else:
+        # Keep multi-line command output readable and aligned under its key
+        text = html_lib.escape(str(value)).replace("\r\n", "\n")
+        fp.write(text.replace("\n", "\n" + pad + "  "))
 
-    safe_problem = html_lib.escape(user_problem, quote=True)
-    safe_ai_analysis = sanitize_ai_html(ai_analysis)
-    
-    css = """
+
+# Never changes between runs, so it is written to the report as-is instead of formatted
+_REPORT_STYLE = """<style>
     :root { --bg: #0d1117; --card: #161b22; --text: #c9d1d9; --accent: #58a6ff; --danger: #f85149; --success: #3fb950; }
     body { font-family: 'Segoe UI', system-ui, sans-serif; background: var(--bg); color: var(--text); margin: 0; padding: 20px; }
     .container { max-width: 1200px; margin: 0 auto; }
@@ -356,14 +779,55 @@ def generate_super_html(data, ai_analysis, user_problem):
     ::-webkit-scrollbar { width: 8px; }
     ::-webkit-scrollbar-track { background: var(--bg); }
     ::-webkit-scrollbar-thumb { background: #30363d; border-radius: 4px; }
+    </style>"""
+
+
+def _write_data_panels(fp, data):
+    """Write one raw-data panel per scan section."""
+    for key, value in data.items():
+        fp.write(f"""
+        <div class="data-panel">
+            <h4>{html_lib.escape(key.upper())}</h4>
+            <pre>""")
+        _render_panel(fp, value)
+        fp.write("""</pre>
+        </div>
+        """)
+
+
+def render_data_panels(data):
+    """Render the raw-data panels ahead of time; they do not depend on the AI analysis."""
+    buffer = io.StringIO()
+    _write_data_panels(buffer, data)
+    return buffer.getvalue()
+
+
+def write_super_html(fp, data, ai_analysis, user_problem, summary, panels=None):
+    """Write a professional HTML diagnostic report with AI analysis to an open text file.
+    
+    panels is the output of render_data_panels(data) when it was rendered early.
     """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+
+    def sanitize_ai_html(value: str) -> str:
+        if not value:
+            return ""
+        cleaned = _SCRIPT_STYLE_RE.sub('', value)
+        cleaned = _EVENT_HANDLER_RE.sub('', cleaned)
+        return cleaned
+
+    safe_problem = html_lib.escape(user_problem, quote=True)
+    mem_percent = summary["mem_percent"]
+    safe_ai_analysis = sanitize_ai_html(ai_analysis)
     
-    html = f"""
+    fp.write(f"""
     <!DOCTYPE html>
     <html>
     <head>
         <title>AI Diagnostic Core | {timestamp}</title>
-        <style>{css}</style>
+        """)
+    fp.write(_REPORT_STYLE)
+    fp.write(f"""
     </head>
     <body>
         <div class="container">
@@ -377,40 +841,36 @@ def generate_super_html(data, ai_analysis, user_problem):
             <div class="status-bar">
                 <div class="stat-card">
                     <h3>CPU CORES</h3>
-                    <div class="value" style="color:var(--accent)">{psutil.cpu_count()}</div>
+                    <div class="value" style="color:var(--accent)">{summary["cpu_count"]}</div>
                 </div>
                 <div class="stat-card">
                     <h3>MEMORY LOAD</h3>
-                    <div class="value" style="color: { 'var(--danger)' if psutil.virtual_memory().percent > 85 else 'var(--success)' }">
-                        {psutil.virtual_memory().percent}%
+                    <div class="value" style="color: { 'var(--danger)' if mem_percent > 85 else 'var(--success)' }">
+                        {mem_percent}%
                     </div>
                 </div>
                 <div class="stat-card">
                     <h3>OS PLATFORM</h3>
-                    <div class="value" style="font-size: 1.2rem; margin-top:15px">{platform.system()} {platform.release()}</div>
+                    <div class="value" style="font-size: 1.2rem; margin-top:15px">{summary["os"]}</div>
                 </div>
             </div>
 
             <div class="ai-analysis">
                 <h2>🤖 Intelligent Analysis & Fixes</h2>
                 <div style="line-height: 1.6; font-size: 1.1rem;">
-                    {safe_ai_analysis.replace(chr(10), '<br>')}
+                    {safe_ai_analysis.translate(_NEWLINE_TO_BR)}
                 </div>
             </div>
 
             <div class="raw-data">
-    """
+    """)
     
-    for key, value in data.items():
-        formatted_val = json.dumps(value, indent=2, default=str).replace('"', '')
-        html += f"""
-        <div class="data-panel">
-            <h4>{key.upper()}</h4>
-            <pre>{formatted_val}</pre>
-        </div>
-        """
+    if panels is None:
+        _write_data_panels(fp, data)
+    else:
+        fp.write(panels)
 
-    html += """
+    fp.write("""
             </div>
             <div style="text-align:center; margin-top:50px; color:#555; font-size:0.8rem;">
                 GENERATED BY SUPER DIAGNOSTIC TOOL v1.0<br>
@@ -419,8 +879,59 @@ def generate_super_html(data, ai_analysis, user_problem):
         </div>
     </body>
     </html>
-    """
-    return html
+    """)
+
+
+def _wrap_ps_variable(match):
+    """Rewrite "$name:" as "$(name):" and "$_:" as "$($_):" in one regex pass."""
+    name = match.group(1)
+    return "$($_):" if name == "_" else f"$({name}):"
+
+
+def dumps_compact(value):
+    """Serialize telemetry as compact JSON for the prompt (no human reads it)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str).decode("utf-8")
+        except TypeError:  # e.g. integers beyond 64 bits; stdlib json copes
+            pass
+    return json.dumps(value, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+def shrink_for_llm(value):
+    """Return a trimmed copy of scan data for the AI prompt."""
+    if isinstance(value, dict):
+        return {
+            key: shrink_for_llm(item) for key, item in value.items()
+            if not (isinstance(item, str) and item in LLM_DROP_VALUES)
+        }
+    if isinstance(value, (list, tuple)):
+        return [shrink_for_llm(item) for item in value[:LLM_MAX_ITEMS]]
+    if isinstance(value, str):
+        value = _SPACE_RUN_RE.sub(" ", _BLANK_LINES_RE.sub("\n", value.strip()))
+        if len(value) > LLM_MAX_TEXT:
+            return value[:LLM_MAX_TEXT] + "…"
+    return value
+
+
+def write_report_file(report_file, *report_args):
+    """Write the HTML report to a file; arguments after the path go to write_super_html."""
+    with open(report_file, "w", encoding="utf-8") as f:
+        write_super_html(f, *report_args)
+
+
+def compact_for_prompt(collected_data):
+    """Trimmed telemetry for the AI prompt, with section-specific cuts on top of shrink_for_llm."""
+    data = shrink_for_llm(collected_data)
+    
+    audit = data.get("Suspicious Process Audit")
+    if isinstance(audit, list):
+        data["Suspicious Process Audit"] = [
+            row if rank < LLM_DETAILED_PROCESSES or not isinstance(row, dict)
+            else {key: value for key, value in row.items() if key not in ("Path", "User")}
+            for rank, row in enumerate(audit)
+        ]
+    return data
 
 
 def is_admin():
@@ -432,7 +943,7 @@ def is_admin():
 
 def main():
     """Main execution flow for the diagnostic tool."""
-    if platform.system() != "Windows":
+    if _OS_SYS != "Windows":
         console.print("[bold red]ERROR: This tool only supports Windows.[/bold red]")
         input("Press Enter to exit...")
         sys.exit(1)
@@ -441,6 +952,15 @@ def main():
         ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
         sys.exit()
 
+    # Reports, scripts and the scan cache all go here; created once up front
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    
+    threading.Thread(target=prime_cpu_counters, daemon=True).start()
+    
+    # The Gemini SDK takes a noticeable time to import and is only needed after
+    # the scans, so load it in the background while the user is being prompted
+    threading.Thread(target=importlib.import_module, args=("google.generativeai",), daemon=True).start()
+    
     os.system('cls' if os.name == 'nt' else 'clear')
     
     console.print(Panel.fit(
@@ -490,32 +1010,72 @@ def main():
         console.print("[bold magenta]INITIATING COMPLETE SYSTEM SCAN...[/bold magenta]")
     collected_data = {"User Reported Issue": user_problem}
     
+    # The process scans are GIL-bound Python loops, so they run one after the
+    # other on their own thread instead of competing with the PowerShell scans
+    process_scans = {scan_performance, scan_suspicious_processes}
+    cpu_tasks = [t for t in tasks if t in process_scans]
+    io_tasks = [t for t in tasks if t not in process_scans]
+    
+    # System CPU is read before the scan sessions start, so their start-up
+    # does not count as load; then only as many sessions as scans are started
+    _cpu_sampler.hold()
+    SystemBrain.warm_sessions(min(len(io_tasks), SCAN_WORKERS))
+    results = {}
+    
     print()
-    with Progress(
-        SpinnerColumn("dots", style="bold magenta"),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(bar_width=None, complete_style="green", finished_style="green"),
-        console=console
-    ) as progress:
-        
-        main_task = progress.add_task("[cyan]Scanning System Layers...", total=len(tasks))
-        
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_task = {executor.submit(t): t.__name__ for t in tasks}
-            
-            for future in as_completed(future_to_task):
-                name = future_to_task[future]
+    if len(tasks) <= 2:
+        # A quick scan is two short scans; running them inline skips the pools and progress bar
+        with console.status("[cyan]Scanning System Layers...", spinner="dots"):
+            for t in tasks:
                 try:
-                    category, data = future.result()
-                    collected_data[category] = data
-                    progress.advance(main_task)
+                    results[t.__name__] = t(collect_processes()) if t in process_scans else t()
                 except Exception as e:
-                    collected_data[name] = str(e)
+                    results[t.__name__] = (t.__name__, str(e))
+    else:
+        with Progress(
+            SpinnerColumn("dots", style="bold magenta"),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(bar_width=None, complete_style="green", finished_style="green"),
+            console=console
+        ) as progress:
+            
+            main_task = progress.add_task("[cyan]Scanning System Layers...", total=len(tasks))
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(len(io_tasks), SCAN_WORKERS))) as io_pool, \
+                    ThreadPoolExecutor(max_workers=1) as cpu_pool:
+                future_to_task = {io_pool.submit(t): t.__name__ for t in io_tasks}
+                
+                if cpu_tasks:
+                    # One process walk feeds every scan that needs the process list
+                    snapshot = cpu_pool.submit(collect_processes)
+                    for t in cpu_tasks:
+                        future_to_task[cpu_pool.submit(lambda t=t: t(snapshot.result()))] = t.__name__
+                
+                for future in as_completed(future_to_task):
+                    name = future_to_task[future]
+                    try:
+                        results[name] = future.result()
+                        progress.advance(main_task)
+                    except Exception as e:
+                        results[name] = (name, str(e))
+    
+    # Sections follow the scan order, not whichever scan happened to finish first
+    for t in tasks:
+        category, data = results[t.__name__]
+        collected_data[category] = data
+    
+    # Status-bar figures for the report, queried once instead of inside the template
+    summary = {
+        "cpu_count": _CPU_LOG,
+        "mem_percent": psutil.virtual_memory().percent,
+        "os": f"{_OS_SYS} {_OS_REL}"
+    }
 
     console.print(Panel("[bold yellow]Transmitting telemetry to Neural Core...[/bold yellow]", border_style="yellow"))
     
     # Configure Gemini API with validation
     try:
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel(GEMINI_MODEL)
     except Exception as e:
@@ -525,6 +1085,11 @@ def main():
         input("\nPress Enter to exit...")
         sys.exit(1)
     
+    # The raw-data panels are rendered while the model is still answering
+    panel_pool = ThreadPoolExecutor(max_workers=1)
+    panels_future = panel_pool.submit(render_data_panels, collected_data)
+    panel_pool.shutdown(wait=False)
+    
     prompt = f"""
     ROLE: Senior Windows Systems Engineer & Security Analyst.
     CONTEXT: User is reporting system issues. Telemetry data is attached.
@@ -589,17 +1154,26 @@ def main():
     
     USER COMPLAINT: "{user_problem}"
     TELEMETRY:
-    {json.dumps(collected_data, default=str)}
+    {dumps_compact(compact_for_prompt(collected_data))}
     """
     
     try:
-        with console.status("Processing telemetry logic...", spinner="dots"):
+        with console.status("Processing telemetry logic...", spinner="dots") as status:
             max_retries = 3
-            raw_response = ""
-            for attempt in range(max_retries):
+            raw_response = load_cached_analysis(prompt) or ""
+            if raw_response:
+                console.print("[dim]Reusing the analysis of an identical recent scan.[/dim]")
+            for attempt in range(0 if raw_response else max_retries):
                 try:
-                    response = model.generate_content(prompt)
-                    raw_response = response.text
+                    # Stream the answer so progress shows while the model is still writing
+                    chunks = []
+                    received = 0
+                    for chunk in model.generate_content(prompt, stream=True):
+                        chunks.append(chunk.text)
+                        received += len(chunk.text)
+                        status.update(f"Receiving analysis... [cyan]{received:,}[/cyan] characters")
+                    raw_response = "".join(chunks)
+                    store_cached_analysis(prompt, raw_response)
                     break 
                 except Exception as e:
                     if "429" in str(e) or "Resource exhausted" in str(e):
@@ -623,16 +1197,16 @@ def main():
             fix_script = raw_response.split("[FIX_START]")[1].split("[FIX_END]")[0].strip()
             fix_script = fix_script.replace("```powershell", "").replace("```", "").strip()
             
-            fix_script = re.sub(r'\$(?!env\b)(\w+):', r'$(\1):', fix_script)
-            fix_script = re.sub(r'\$_([:])', r'$($_)\1', fix_script)
+            fix_script = _PS_VAR_COLON_RE.sub(_wrap_ps_variable, fix_script)
         
-        html_content = generate_super_html(collected_data, ai_analysis, user_problem)
-        
-        if not os.path.exists(CACHE_DIR): os.makedirs(CACHE_DIR)
         report_file = os.path.join(CACHE_DIR, f"Diagnosis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
         
-        with open(report_file, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        # The report is written while the safety checks run; joined before it is opened
+        report_writer = threading.Thread(
+            target=write_report_file,
+            args=(report_file, collected_data, ai_analysis, user_problem, summary, panels_future.result())
+        )
+        report_writer.start()
             
         console.print(Panel(f"[bold green]ANALYSIS COMPLETE[/bold green]\\nReport: [underline]{report_file}[/underline]", border_style="green"))
         
@@ -701,6 +1275,7 @@ def main():
             console.print(f"[dim]{script_path}[/dim]")
 
             if Confirm.ask("\nOpen detailed report?"):
+                report_writer.join()
                 webbrowser.open(f"file://{report_file}")
             return
 
@@ -731,6 +1306,7 @@ def main():
             console.print("[cyan]You can review and execute it manually as Administrator.[/cyan]")
 
             if Confirm.ask("\nOpen detailed report?"):
+                report_writer.join()
                 webbrowser.open(f"file://{report_file}")
             return
 
@@ -756,6 +1332,7 @@ def main():
                 console.print(f"\n[cyan]Script saved to:[/cyan] [dim]{script_path}[/dim]")
 
                 if Confirm.ask("\nOpen detailed report?"):
+                    report_writer.join()
                     webbrowser.open(f"file://{report_file}")
                 return
 
@@ -763,19 +1340,22 @@ def main():
         console.print("\n[bold green]═══ EXECUTING REMEDIATION ═══[/bold green]")
         console.print("[cyan]→ Taking pre-execution snapshot...[/cyan]")
 
-        # Initialize enhanced monitoring
+        # Initialize enhanced monitoring (one PowerShell session for both snapshots)
         monitor = EnhancedMonitoring()
-        pre_snapshot = monitor.take_snapshot()
-        console.print("[green]✔ Snapshot captured[/green]\n")
+        with monitor:
+            pre_snapshot = monitor.take_snapshot()
+            console.print("[green]✔ Snapshot captured[/green]\n")
 
-        console.print("[cyan]→ Running in monitored sandbox environment...[/cyan]\n")
+            console.print("[cyan]→ Running in monitored sandbox environment...[/cyan]\n")
 
-        executor = SandboxExecutor(fix_script)
-        success, stdout, stderr = executor.execute_with_monitoring(timeout=300)
+            executor = SandboxExecutor(fix_script)
+            success, stdout, stderr = executor.execute_with_monitoring(timeout=300)
+            # The fix may have changed what the cached queries report
+            SystemBrain.clear_ps_cache()
 
-        # Take post-execution snapshot
-        console.print("\n[cyan]→ Taking post-execution snapshot...[/cyan]")
-        post_snapshot = monitor.take_snapshot()
+            # Take post-execution snapshot
+            console.print("\n[cyan]→ Taking post-execution snapshot...[/cyan]")
+            post_snapshot = monitor.take_snapshot()
 
         # Detect changes
         changes = monitor.detect_changes(pre_snapshot, post_snapshot)
@@ -830,6 +1410,7 @@ def main():
                 console.print(Panel(execution_log, title="Execution Log", style="dim"))
 
         if Confirm.ask("\nOpen detailed diagnostic report?"):
+            report_writer.join()
             webbrowser.open(f"file://{report_file}")
     except Exception as e:
         console.print(f"[bold red]SYSTEM ERROR:[/bold red] {e}")
@@ -839,4 +1420,7 @@ if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        sys.exit()
\ No newline at end of file
+        sys.exit()
+    finally:
+        SystemBrain.close_sessions()
+        SystemBrain.save_ps_cache()
\ No newline at end of file
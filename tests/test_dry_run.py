@@ -0,0 +1,48 @@
+"""The dry-run simulator must report the same analysis for text and UTF-8 bytes."""
+
+import random
+import unittest
+
+from src.safety.dry_run import DryRunSimulator
+
+
+# Script fragments mixing scanned cmdlets with characters on which bytes-mode
+# and str-mode regexes disagree (non-ASCII letters, case folds, separators)
+_FRAGMENTS = [
+    "Set-ItemProperty ", "Registry::", "HKLM:\\Software\\Test", "New-Item ",
+    "Stop-Service ", "Set-Service ", "-StartupType ", "Remove-Item ",
+    "Stop-Process ", "-Name ", "netsh ", "spooler", "\"", "'", " ", "\t", "\n",
+    "é", "ß", "ſ", "\u212a", "\x1c", "\x85", "\u00a0", "日本",
+]
+
+
+class TextBytesEquivalenceTest(unittest.TestCase):
+
+    def setUp(self):
+        DryRunSimulator.cache_clear()
+
+    def assert_same(self, script):
+        text = DryRunSimulator.simulate(script)
+        DryRunSimulator.cache_clear()
+        self.assertEqual(text, DryRunSimulator.simulate(script.encode('utf-8')), repr(script))
+
+    def test_ascii_script(self):
+        self.assert_same(
+            "Stop-Service spooler\n"
+            "Set-Service wuauserv -StartupType Disabled\n"
+            "Remove-Item C:\\Temp\\cache -Recurse\n"
+            "Set-ItemProperty -Path HKLM:\\Software\\Test -Name X -Value 1\n"
+        )
+
+    def test_non_ascii_script(self):
+        self.assert_same("Set-ItemPropertyéx Registry::HKLM\\Software\\Tést\nStop-Service spooléř")
+
+    def test_random_scripts(self):
+        rng = random.Random(1)
+        for _ in range(2000):
+            script = "".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(1, 25)))
+            self.assert_same(script)
+
+
+if __name__ == '__main__':
+    unittest.main()